@@ -0,0 +1,34 @@
+import base64, json, uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(ts: datetime, row_id: Any) -> str:
+    raw = json.dumps([ts.isoformat(), str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, row_id = json.loads(raw)
+        return datetime.fromisoformat(ts), uuid.UUID(row_id)
+    except Exception:
+        raise HTTPException(400, "invalid cursor")
+
+def paginate(stmt: Select, ts_col, id_col, limit: int, cursor: Optional[str]) -> Select:
+    """Keyset page over (ts_col, id_col), newest first; fetches one extra row to detect a next page"""
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(ts_col, id_col) < tuple_(ts, row_id))
+    return stmt.order_by(ts_col.desc(), id_col.desc()).limit(limit + 1)
+
+def page(rows: List[Any], limit: int, ts_key: str, serialize: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+    """Trim the extra row fetched by paginate() and build the next cursor"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], ts_key), rows[-1].id)
+    return {"items": [serialize(r) for r in rows], "next_cursor": next_cursor}
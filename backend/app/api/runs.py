@@ -1,28 +1,131 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.core.config import settings
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import async_session
-from sqlalchemy import insert, select
+from sqlalchemy import insert, select, update, func
 from app.models.workflow_runs import WorkflowRun
 from app.models.workflows import Workflow
+from app.models.run_steps import RunStep
+from app.models.trace_events import TraceEvent
+from app.api.pagination import MAX_PAGE_SIZE, page, paginate
 from uuid import uuid4
+from celery import group
 from worker.worker import execute_workflow
 
 router = APIRouter()
 
+@router.get("/")
+async def list_runs(
+    workflow_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    stmt = select(
+        WorkflowRun.id, WorkflowRun.workflow_id, WorkflowRun.status, WorkflowRun.started_at,
+        WorkflowRun.finished_at, WorkflowRun.total_tokens, WorkflowRun.total_cost_cents,
+        WorkflowRun.total_latency_ms,
+    )
+    if workflow_id:
+        stmt = stmt.where(WorkflowRun.workflow_id==workflow_id)
+    if status:
+        stmt = stmt.where(WorkflowRun.status==status)
+    stmt = paginate(stmt, WorkflowRun.started_at, WorkflowRun.id, limit, cursor)
+    async with async_session() as db:
+        rows = (await db.execute(stmt)).all()
+    return page(rows, limit, "started_at", lambda r: {
+        "run_id": str(r.id),
+        "workflow_id": str(r.workflow_id),
+        "status": r.status,
+        "started_at": r.started_at,
+        "finished_at": r.finished_at,
+        "total_tokens": r.total_tokens,
+        "total_cost_cents": r.total_cost_cents,
+        "total_latency_ms": r.total_latency_ms,
+    })
+
 @router.post("/{workflow_id}/runs")
-async def trigger_run(workflow_id: str):
+async def trigger_run(workflow_id: str, data: Optional[dict] = None):
+    inputs = (data or {}).get("inputs")
+    if inputs is not None and not isinstance(inputs, dict):
+        raise HTTPException(422, "inputs must be an object")
     async with async_session() as db:  # type: AsyncSession
         wf = await db.get(Workflow, workflow_id)
         if not wf:
             raise HTTPException(404, "workflow not found")
         run_id = uuid4()
         await db.execute(insert(WorkflowRun).values(
-            id=run_id, workflow_id=workflow_id, status="queued"
+            id=run_id, workflow_id=workflow_id, status="queued", inputs=inputs
         ))
         await db.commit()
     execute_workflow.delay(str(run_id))
     return {"run_id": str(run_id)}
 
+@router.post("/{workflow_id}/runs/bulk")
+async def trigger_runs_bulk(workflow_id: str, data: dict):
+    """One run per entry of data["inputs"], inserted in bulk and enqueued as one group"""
+    inputs = data.get("inputs")
+    if not isinstance(inputs, list) or not inputs or not all(isinstance(i, dict) for i in inputs):
+        raise HTTPException(422, "inputs must be a non-empty list of objects")
+    if len(inputs) > settings.BULK_MAX_RUNS:
+        raise HTTPException(413, f"at most {settings.BULK_MAX_RUNS} runs per batch")
+    batch_id = uuid4()
+    run_ids = [uuid4() for _ in inputs]
+    async with async_session() as db:
+        exists = (await db.execute(select(Workflow.id).where(Workflow.id==workflow_id))).first()
+        if not exists:
+            raise HTTPException(404, "workflow not found")
+        # executemany: SQLAlchemy sends these as batched multi-row INSERTs
+        await db.execute(insert(WorkflowRun), [
+            {"id": rid, "workflow_id": workflow_id, "status": "queued", "inputs": i, "batch_id": batch_id}
+            for rid, i in zip(run_ids, inputs)
+        ])
+        await db.commit()
+    # one task per run so runs execute in parallel and fail independently;
+    # the group publishes them all over a single producer connection
+    group(execute_workflow.s(str(rid)) for rid in run_ids).apply_async()
+    return {"batch_id": str(batch_id), "runs": len(run_ids)}
+
+@router.get("/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    stmt = select(
+        WorkflowRun.status, func.count(), func.sum(WorkflowRun.total_tokens), func.sum(WorkflowRun.total_cost_cents)
+    ).where(WorkflowRun.batch_id==batch_id).group_by(WorkflowRun.status)
+    async with async_session() as db:
+        rows = (await db.execute(stmt)).all()
+    if not rows:
+        raise HTTPException(404, "batch not found")
+    by_status = {status: count for status, count, _, _ in rows}
+    total = sum(by_status.values())
+    finished = by_status.get("succeeded", 0) + by_status.get("failed", 0)
+    return {
+        "batch_id": batch_id,
+        "total": total,
+        "finished": finished,
+        "progress": finished / total,
+        "by_status": by_status,
+        "total_tokens": sum(t or 0 for _, _, t, _ in rows),
+        "total_cost_cents": sum(c or 0 for _, _, _, c in rows),
+    }
+
+@router.post("/{run_id}/resume")
+async def resume_run(run_id: str):
+    """Re-run a failed run's failed and unreached nodes, reusing checkpointed outputs"""
+    async with async_session() as db:
+        run = await db.get(WorkflowRun, run_id)
+        if not run:
+            raise HTTPException(404, "run not found")
+        # conditional update so two concurrent resumes can't both enqueue
+        res = await db.execute(update(WorkflowRun).where(
+            WorkflowRun.id==run_id, WorkflowRun.status=="failed"
+        ).values(status="queued", finished_at=None, attempt=WorkflowRun.attempt + 1))
+        await db.commit()
+        if res.rowcount != 1:
+            raise HTTPException(409, f"only failed runs can be resumed (status is {run.status})")
+    execute_workflow.delay(run_id, resume=True)
+    return {"run_id": run_id, "resumed": True}
+
 @router.get("/{run_id}")
 async def get_run(run_id: str):
     async with async_session() as db:
@@ -33,8 +136,82 @@ async def get_run(run_id: str):
             "run_id": run_id,
             "workflow_id": str(run.workflow_id),
             "status": run.status,
+            "batch_id": str(run.batch_id) if run.batch_id else None,
+            "inputs": run.inputs,
+            "started_at": run.started_at,
+            "finished_at": run.finished_at,
             "total_tokens": run.total_tokens,
             "total_cost_cents": run.total_cost_cents,
             "total_latency_ms": run.total_latency_ms,
             "error_summary": run.error_summary,
         }
+
+@router.get("/{run_id}/trace")
+async def get_trace(
+    run_id: str,
+    after: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    kind: Optional[str] = None,
+    step_id: Optional[str] = None,
+):
+    """A run's trace events in id order; pass next_after back as `after` for the next page"""
+    stmt = select(TraceEvent.id, TraceEvent.ts, TraceEvent.kind, TraceEvent.step_id, TraceEvent.payload)
+    stmt = stmt.where(TraceEvent.run_id==run_id)
+    if step_id:
+        stmt = stmt.where(TraceEvent.step_id==step_id)
+    if kind:
+        stmt = stmt.where(TraceEvent.kind==kind)
+    stmt = stmt.where(TraceEvent.id > after).order_by(TraceEvent.id).limit(limit)
+    async with async_session() as db:
+        rows = (await db.execute(stmt)).all()
+    return {
+        "items": [{
+            "id": r.id,
+            "ts": r.ts,
+            "kind": r.kind,
+            "step_id": str(r.step_id) if r.step_id else None,
+            "payload": r.payload,
+        } for r in rows],
+        "next_after": rows[-1].id if len(rows) == limit else None,
+    }
+
+@router.get("/{run_id}/steps")
+async def list_steps(run_id: str):
+    stmt = select(
+        RunStep.id, RunStep.node_id, RunStep.node_type, RunStep.status, RunStep.started_at,
+        RunStep.latency_ms, RunStep.tokens_input, RunStep.tokens_output, RunStep.cost_cents,
+    ).where(RunStep.run_id==run_id).order_by(RunStep.started_at, RunStep.id)
+    async with async_session() as db:
+        rows = (await db.execute(stmt)).all()
+    return [{
+        "step_id": str(r.id),
+        "node_id": r.node_id,
+        "node_type": r.node_type,
+        "status": r.status,
+        "started_at": r.started_at,
+        "latency_ms": r.latency_ms,
+        "tokens_input": r.tokens_input,
+        "tokens_output": r.tokens_output,
+        "cost_cents": r.cost_cents,
+    } for r in rows]
+
+@router.get("/{run_id}/steps/{step_id}")
+async def get_step(run_id: str, step_id: str):
+    async with async_session() as db:
+        step = await db.get(RunStep, step_id)
+        if not step or str(step.run_id) != run_id:
+            raise HTTPException(404, "step not found")
+        return {
+            "step_id": step_id,
+            "run_id": run_id,
+            "node_id": step.node_id,
+            "node_type": step.node_type,
+            "status": step.status,
+            "started_at": step.started_at,
+            "finished_at": step.finished_at,
+            "latency_ms": step.latency_ms,
+            "tokens_input": step.tokens_input,
+            "tokens_output": step.tokens_output,
+            "cost_cents": step.cost_cents,
+            "error_summary": step.error_summary,
+        }
@@ -1,17 +1,43 @@
-from fastapi import APIRouter
+import json
+from typing import Optional
+from fastapi import APIRouter, Header, Request
 from fastapi.responses import StreamingResponse
-from app.executor.tracing import subscribe
+from app.db.session import async_session
+from app.executor.eventbus import get_event_bus
+from app.models.workflow_runs import WorkflowRun
+from app.executor.tracing import subscribe, is_terminal
 
 router = APIRouter()
 
+async def _current_attempt(run_id: str) -> int:
+    async with async_session() as db:
+        run = await db.get(WorkflowRun, run_id)
+        return (run.attempt or 1) if run else 1
+
+@router.get("/stats")
+async def stream_stats():
+    return get_event_bus().stats()
+
 @router.get("/{run_id}")
-async def stream_run_events(run_id: str):
+async def stream_run_events(run_id: str, request: Request, last_event_id: Optional[str] = Header(default=None)):
+    # EventSource sends Last-Event-ID on reconnect; replay resumes after it
     async def event_stream():
-        q = await subscribe(run_id)
+        feed = subscribe(run_id, last_event_id)
         try:
-            while True:
-                evt = await q.get()
-                yield f"event: trace\ndata: {evt}\n\n"
+            async for item in feed:
+                if item is None:
+                    if await request.is_disconnected():
+                        return
+                    yield ": heartbeat\n\n"
+                    continue
+                event_id, evt = item
+                yield f"id: {event_id}\nevent: trace\ndata: {json.dumps(evt, default=str)}\n\n"
+                # a replayed end of an attempt that was since resumed is not the end
+                if is_terminal(evt) and is_terminal(evt, await _current_attempt(run_id)):
+                    return
         except Exception:
             return
+        finally:
+            # unsubscribe as soon as the client goes away or the run ends
+            await feed.aclose()
     return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -1,29 +1,44 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import async_session
 from sqlalchemy import insert, select, update, delete
 from app.models.workflows import Workflow
-from app.schemas.workflow_schema import WorkflowSpec
+from app.executor.compiler import graph_cache
+from app.api.pagination import MAX_PAGE_SIZE, page, paginate
+from pydantic import ValidationError
 from uuid import uuid4
 
 router = APIRouter()
 
+def _compile(graph_json, workflow_id: Optional[str] = None):
+    # invalid specs, `when` expressions and cycles are client errors
+    try:
+        return graph_cache.load(graph_json, workflow_id)
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(422, str(e))
+
 @router.get("/")
-async def list_workflows():
+async def list_workflows(limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    # graph_json is never loaded for listings
+    stmt = select(Workflow.id, Workflow.name, Workflow.description, Workflow.created_at)
+    stmt = paginate(stmt, Workflow.created_at, Workflow.id, limit, cursor)
     async with async_session() as db:
-        rows = (await db.execute(select(Workflow))).scalars().all()
-        return [{"id": str(r.id), "name": r.name, "description": r.description} for r in rows]
+        rows = (await db.execute(stmt)).all()
+    return page(rows, limit, "created_at", lambda r: {
+        "id": str(r.id), "name": r.name, "description": r.description, "created_at": r.created_at
+    })
 
 @router.post("/")
 async def create_workflow(data: dict):
-    spec = WorkflowSpec.parse_obj(data.get("graph_json"))
+    spec = _compile(data.get("graph_json")).spec
     async with async_session() as db:
         new_id = uuid4()
         await db.execute(insert(Workflow).values(
             id=new_id,
             name=data.get("name", "Untitled"),
             description=data.get("description", ""),
-            graph_json=spec.dict(),
+            graph_json=spec.dict(by_alias=True),
         ))
         await db.commit()
         return {"id": str(new_id)}
@@ -39,7 +54,8 @@ async def get_workflow(workflow_id: str):
 @router.put("/{workflow_id}")
 async def update_workflow(workflow_id: str, data: dict):
     if "graph_json" in data:
-        _ = WorkflowSpec.parse_obj(data["graph_json"])
+        graph_cache.invalidate(workflow_id)
+        _ = _compile(data["graph_json"], workflow_id)
     async with async_session() as db:
         await db.execute(update(Workflow).where(Workflow.id==workflow_id).values(
             name=data.get("name"), description=data.get("description"), graph_json=data.get("graph_json")
@@ -5,7 +5,86 @@ class Settings(BaseSettings):
     REDIS_URL: str
     OPENAI_API_KEY: str | None = None
     GEMINI_API_KEY: str | None = None
+
+    # database connection pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+
+    # pooled LLM clients
+    LLM_CLIENT_POOL_SIZE: int = 64
+    LLM_CLIENT_IDLE_SECONDS: float = 600
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE: int = 20
+    LLM_HTTP_KEEPALIVE_SECONDS: float = 30
+    LLM_HTTP_TIMEOUT_SECONDS: float = 120
+
+    # provider rate limiting: "local" (per worker) or "redis" (shared across workers)
+    LLM_RATE_LIMIT_ENABLED: bool = True
+    LLM_RATE_LIMIT_BACKEND: str = "local"
+
+    # validated + compiled workflow graphs kept per process
+    GRAPH_CACHE_MAX_ENTRIES: int = 512
+
+    # streamed completions: llm.delta events are coalesced by size / age
+    LLM_STREAM_DEFAULT: bool = False
+    LLM_DELTA_MIN_CHARS: int = 64
+    LLM_DELTA_MAX_DELAY_SECONDS: float = 0.1
+
+    # retries for transient provider errors and per provider/model circuit breaker
+    LLM_RETRY_ATTEMPTS: int = 3
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+
+    # hedged calls: fire the fallback once the primary exceeds its p95 latency
+    LLM_HEDGE_DEFAULT_DELAY_MS: float = 5000
+    LLM_HEDGE_WINDOW: int = 200
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+
+    # built-in offline "mock" provider (benchmarks, local development)
+    MOCK_LLM_LATENCY_MS: float = 50
+    MOCK_LLM_LATENCY_JITTER_MS: float = 0
+    MOCK_LLM_ERROR_RATE: float = 0.0
+    MOCK_LLM_OUTPUT_TOKENS: int = 32
+
+    # record/replay of provider calls: "off", "record" or "replay"
+    LLM_REPLAY_MODE: str = "off"
+    LLM_REPLAY_PATH: str = "llm_replay.jsonl.gz"
+    LLM_REPLAY_LATENCY_SCALE: float = 1.0
+
+    # exact-match LLM response cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_REDIS: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_MAX_ENTRIES: int = 2048
+
+    # buffered trace-event writes
+    TRACE_FLUSH_MAX_EVENTS: int = 200
+    TRACE_FLUSH_INTERVAL_SECONDS: float = 0.5
+
+    # bulk run submission
+    BULK_MAX_RUNS: int = 50000
+
+    # live run totals (tokens/cost/latency) written to workflow_runs
+    RUN_TOTALS_FLUSH_INTERVAL_SECONDS: float = 1.0
+
+    # live event bus for SSE: "redis" (streams) or "memory" (single process)
+    EVENT_BUS_BACKEND: str = "redis"
+    EVENT_BUS_HISTORY: int = 10000
+    EVENT_BUS_TTL_SECONDS: int = 86400
+    # memory backend: runs whose history is kept (least recently published dropped first)
+    EVENT_BUS_MAX_RUNS: int = 1000
+    SSE_SUBSCRIBER_BUFFER: int = 1000
+    SSE_HEARTBEAT_SECONDS: float = 15.0
     
+    # Prometheus metrics (needs prometheus_client) and OpenTelemetry spans (needs opentelemetry-api)
+    METRICS_ENABLED: bool = True
+    WORKER_METRICS_PORT: int = 9100
+    OTEL_ENABLED: bool = False
+
     class Config:
         env_file = ".env"
         
@@ -0,0 +1,85 @@
+"""
+Prometheus metrics and OpenTelemetry spans for the executor hot path.
+Both are optional: without prometheus_client (or with METRICS_ENABLED off)
+every metric is a no-op, and spans are only created when OTEL_ENABLED is set
+and opentelemetry-api is installed.
+"""
+from contextlib import nullcontext
+from typing import Any, ContextManager, Optional
+from app.core.config import settings
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover - optional dependency
+    prometheus_client = None
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - optional dependency
+    otel_trace = None
+
+
+class _NoopMetric:
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def set_function(self, fn) -> None:
+        pass
+
+
+enabled = prometheus_client is not None and settings.METRICS_ENABLED
+_NOOP = _NoopMetric()
+
+def _metric(kind: str, name: str, doc: str, labels=(), **kwargs: Any):
+    if not enabled:
+        return _NOOP
+    return getattr(prometheus_client, kind)(name, doc, labels, **kwargs)
+
+# latency buckets from a cache hit up to a slow completion
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+node_duration = _metric(
+    "Histogram", "flowtrace_node_duration_seconds", "Node execution time", ("node_type", "status"), buckets=_BUCKETS
+)
+llm_call_duration = _metric(
+    "Histogram", "flowtrace_llm_call_duration_seconds", "Provider call time, retries included",
+    ("provider", "model", "outcome"), buckets=_BUCKETS
+)
+llm_cache_requests = _metric("Counter", "flowtrace_llm_cache_requests_total", "LLM cache lookups", ("result",))
+trace_flush_duration = _metric(
+    "Histogram", "flowtrace_trace_flush_seconds", "DB time per trace-event write", buckets=_BUCKETS
+)
+trace_events_written = _metric("Counter", "flowtrace_trace_events_written_total", "Trace events inserted")
+queue_wait = _metric(
+    "Histogram", "flowtrace_queue_wait_seconds", "Time from run creation to a worker picking it up", buckets=_BUCKETS
+)
+runs_finished = _metric("Counter", "flowtrace_runs_finished_total", "Finished runs", ("status",))
+sse_subscribers = _metric("Gauge", "flowtrace_sse_subscribers", "Open SSE subscriptions")
+
+
+def render_latest() -> tuple:
+    """(body, content_type) for a /metrics response"""
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def start_http_server(port: int) -> None:
+    if enabled and port:
+        prometheus_client.start_http_server(port)
+
+
+_tracer = otel_trace.get_tracer("flowtrace") if otel_trace is not None and settings.OTEL_ENABLED else None
+
+def span(name: str, **attributes: Any) -> ContextManager[Optional[Any]]:
+    """An OpenTelemetry span, or a shared no-op context when tracing is off"""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes)
@@ -0,0 +1,12 @@
+from typing import Dict, Optional
+
+# Per-worker defaults; (provider, None) applies to any model of that provider
+RATE_LIMITS = {
+    ("openai", None): {"rpm": 500, "tpm": 200000, "concurrency": 16},
+    ("openai", "gpt-5"): {"rpm": 500, "tpm": 150000, "concurrency": 8},
+    ("gemini", None): {"rpm": 300, "tpm": 250000, "concurrency": 16},
+    ("gemini", "gemini-2.5-pro"): {"rpm": 150, "tpm": 125000, "concurrency": 8},
+}
+
+def get_rate_limit(provider: str, model: str) -> Optional[Dict[str, int]]:
+    return RATE_LIMITS.get((provider, model)) or RATE_LIMITS.get((provider, None))
@@ -0,0 +1,16 @@
+import asyncio
+import weakref
+import redis.asyncio as aioredis
+from app.core.config import settings
+
+# redis.asyncio connections are bound to the loop that opened them,
+# so keep one client per event loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+
+def get_redis() -> aioredis.Redis:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = aioredis.from_url(settings.REDIS_URL)
+        _clients[loop] = client
+    return client
@@ -0,0 +1,34 @@
+"""listing indexes
+
+Revision ID: 5c2e9a7d41b3
+Revises: 1eb00cbf20f0
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e9a7d41b3'
+down_revision: Union[str, Sequence[str], None] = '1eb00cbf20f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_workflows_created_at_id', 'workflows', ['created_at', 'id'], unique=False)
+    op.create_index('ix_workflow_runs_started_at_id', 'workflow_runs', ['started_at', 'id'], unique=False)
+    op.create_index('ix_workflow_runs_workflow_id_started_at_id', 'workflow_runs', ['workflow_id', 'started_at', 'id'], unique=False)
+    op.create_index('ix_workflow_runs_status_started_at_id', 'workflow_runs', ['status', 'started_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_workflow_runs_status_started_at_id', table_name='workflow_runs')
+    op.drop_index('ix_workflow_runs_workflow_id_started_at_id', table_name='workflow_runs')
+    op.drop_index('ix_workflow_runs_started_at_id', table_name='workflow_runs')
+    op.drop_index('ix_workflows_created_at_id', table_name='workflows')
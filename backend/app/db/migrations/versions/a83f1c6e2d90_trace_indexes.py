@@ -0,0 +1,32 @@
+"""trace indexes
+
+Revision ID: a83f1c6e2d90
+Revises: 5c2e9a7d41b3
+Create Date: 2026-10-18 10:03:17.524961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83f1c6e2d90'
+down_revision: Union[str, Sequence[str], None] = '5c2e9a7d41b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_trace_events_run_id_id', 'trace_events', ['run_id', 'id'], unique=False)
+    op.create_index('ix_trace_events_step_id_id', 'trace_events', ['step_id', 'id'], unique=False)
+    op.create_index('ix_run_steps_run_id_started_at', 'run_steps', ['run_id', 'started_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_run_steps_run_id_started_at', table_name='run_steps')
+    op.drop_index('ix_trace_events_step_id_id', table_name='trace_events')
+    op.drop_index('ix_trace_events_run_id_id', table_name='trace_events')
@@ -0,0 +1,28 @@
+"""run step output
+
+Revision ID: c41d7b2e9f05
+Revises: a83f1c6e2d90
+Create Date: 2026-10-18 11:26:48.903512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7b2e9f05'
+down_revision: Union[str, Sequence[str], None] = 'a83f1c6e2d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('run_steps', sa.Column('output', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('run_steps', 'output')
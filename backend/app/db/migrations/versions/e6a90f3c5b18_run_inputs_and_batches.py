@@ -0,0 +1,32 @@
+"""run inputs and batches
+
+Revision ID: e6a90f3c5b18
+Revises: c41d7b2e9f05
+Create Date: 2026-10-18 12:40:05.271839
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a90f3c5b18'
+down_revision: Union[str, Sequence[str], None] = 'c41d7b2e9f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workflow_runs', sa.Column('inputs', sa.JSON(), nullable=True))
+    op.add_column('workflow_runs', sa.Column('batch_id', sa.UUID(), nullable=True))
+    op.create_index('ix_workflow_runs_batch_id_status', 'workflow_runs', ['batch_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_workflow_runs_batch_id_status', table_name='workflow_runs')
+    op.drop_column('workflow_runs', 'batch_id')
+    op.drop_column('workflow_runs', 'inputs')
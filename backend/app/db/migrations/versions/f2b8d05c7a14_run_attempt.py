@@ -0,0 +1,28 @@
+"""run attempt
+
+Revision ID: f2b8d05c7a14
+Revises: e6a90f3c5b18
+Create Date: 2026-10-18 16:05:42.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d05c7a14'
+down_revision: Union[str, Sequence[str], None] = 'e6a90f3c5b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workflow_runs', sa.Column('attempt', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workflow_runs', 'attempt')
@@ -0,0 +1,94 @@
+import hashlib, json, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.redis import get_redis
+
+KEY_PREFIX = "flowtrace:llm:"
+
+
+def cache_key(provider: str, model: str, system: str, prompt: str, temperature: float) -> str:
+    """Stable hash of everything that determines an LLM response"""
+    raw = json.dumps([provider, model, system, prompt, float(temperature)], ensure_ascii=False)
+    return KEY_PREFIX + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """In-process LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LLMCache:
+    """
+    Two-tier exact-match cache: local LRU in front of a shared Redis tier.
+    The Redis tier is best-effort; any Redis error is treated as a miss.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, use_redis: bool):
+        self.local = LRUCache(max_entries, ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+
+    def _client(self):
+        return get_redis() if self.use_redis else None
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(key)
+        except Exception:
+            return None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.local.set(key, value)
+        client = self._client()
+        if client is None:
+            return
+        try:
+            await client.set(key, json.dumps(value), ex=self.ttl_seconds)
+        except Exception:
+            pass
+
+
+llm_cache = LLMCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    use_redis=settings.LLM_CACHE_REDIS,
+)
@@ -0,0 +1,95 @@
+import asyncio, time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+import httpx
+from langchain_openai import ChatOpenAI
+from langchain_google_genai import ChatGoogleGenerativeAI
+from app.core.config import settings
+
+ClientKey = Tuple[str, str, float]
+
+
+class ClientRegistry:
+    """
+    Bounded cache of configured chat clients keyed by (provider, model, temperature).
+    OpenAI clients share one keep-alive httpx pool; Gemini clients keep their own
+    SDK client, which is reused as long as the instance is cached.
+    """
+
+    def __init__(self, max_size: int, idle_seconds: float):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._clients: "OrderedDict[ClientKey, Tuple[Any, float]]" = OrderedDict()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self, provider: str, model: str, temperature: float) -> Any:
+        self._bind_loop()
+        self._evict_idle(time.monotonic())
+        key = (provider, model, float(temperature))
+        entry = self._clients.get(key)
+        client = entry[0] if entry else self._build(provider, model, temperature)
+        self._clients[key] = (client, time.monotonic())
+        self._clients.move_to_end(key)
+        while len(self._clients) > self.max_size:
+            self._clients.popitem(last=False)
+        return client
+
+    def _bind_loop(self) -> None:
+        # pooled connections belong to the loop that opened them; a new loop
+        # (e.g. a fresh asyncio.run) starts with a fresh pool
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._clients.clear()
+            self._http = None
+            self._loop = loop
+
+    def _evict_idle(self, now: float) -> None:
+        while self._clients:
+            key, (_, last_used) = next(iter(self._clients.items()))
+            if now - last_used < self.idle_seconds:
+                break
+            del self._clients[key]
+
+    def _http_client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_SECONDS,
+                ),
+                timeout=httpx.Timeout(settings.LLM_HTTP_TIMEOUT_SECONDS),
+            )
+        return self._http
+
+    def _build(self, provider: str, model: str, temperature: float) -> Any:
+        if provider == "openai":
+            return ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                api_key=settings.OPENAI_API_KEY,
+                http_async_client=self._http_client(),
+                max_retries=0,  # retries are handled by executor.resilience
+                stream_usage=True,  # usage metadata on streamed responses too
+            )
+        if provider == "gemini":
+            return ChatGoogleGenerativeAI(
+                model=model,
+                temperature=temperature,
+                google_api_key=settings.GEMINI_API_KEY,
+                max_retries=0,
+            )
+        raise ValueError(f"Unsupported provider: {provider}")
+
+    async def aclose(self) -> None:
+        self._clients.clear()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+client_registry = ClientRegistry(
+    max_size=settings.LLM_CLIENT_POOL_SIZE,
+    idle_seconds=settings.LLM_CLIENT_IDLE_SECONDS,
+)
@@ -1,5 +1,10 @@
-from typing import Dict, List, Set, Tuple
+import hashlib, json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
 from app.schemas.workflow_schema import WorkflowSpec, Node, Edge
+from app.executor.conditions import Condition, compile_condition
+from app.executor.templates import Template, compile_template
 
 
 class CompiledGraph:
@@ -8,9 +13,18 @@ class CompiledGraph:
         self.nodes: Dict[str, Node] = {n.id: n for n in spec.nodes}
         self.adj: Dict[str, List[str]] = {n.id: [] for n in spec.nodes}
         self.rev: Dict[str, List[str]] = {n.id: [] for n in spec.nodes}
+        # compiled `when` predicates by (from, to); unconditional edges are absent
+        self.conditions: Dict[Tuple[str, str], Condition] = {}
         for e in spec.edges:
             self.adj[e.from_].append(e.to)
             self.rev[e.to].append(e.from_)
+            if e.when:
+                self.conditions[(e.from_, e.to)] = compile_condition(e.when)
+        # input templates parsed up front
+        self.templates: Dict[str, Template] = {
+            n.id: compile_template(n.inputs["text"])
+            for n in spec.nodes if isinstance(n.inputs.get("text"), str)
+        }
             
         self.levels: List[List[str]] = self._levels()
         
@@ -39,4 +53,48 @@ class CompiledGraph:
 def compile_graph(spec: WorkflowSpec) -> CompiledGraph:
     # Basic sanity: entry must have no incoming edges
     compiled = CompiledGraph(spec)
-    return compiled
\ No newline at end of file
+    return compiled
+
+
+def graph_hash(graph_json: Dict[str, Any]) -> str:
+    """Content hash of a workflow graph, independent of key order"""
+    raw = json.dumps(graph_json, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class GraphCache:
+    """
+    LRU of validated, compiled graphs keyed by content hash. Compiled graphs
+    are shared read-only between runs. Entries are also indexed by workflow
+    id so an updated workflow drops its previous version.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._graphs: "OrderedDict[str, CompiledGraph]" = OrderedDict()
+        self._by_workflow: Dict[str, str] = {}
+
+    def load(self, graph_json: Dict[str, Any], workflow_id: Optional[str] = None) -> CompiledGraph:
+        key = graph_hash(graph_json)
+        comp = self._graphs.get(key)
+        if comp is None:
+            comp = compile_graph(WorkflowSpec.parse_obj(graph_json))
+            self._graphs[key] = comp
+            while len(self._graphs) > self.max_entries:
+                self._graphs.popitem(last=False)
+        else:
+            self._graphs.move_to_end(key)
+        if workflow_id is not None:
+            previous = self._by_workflow.get(workflow_id)
+            if previous is not None and previous != key:
+                self._graphs.pop(previous, None)
+            self._by_workflow[workflow_id] = key
+        return comp
+
+    def invalidate(self, workflow_id: str) -> None:
+        key = self._by_workflow.pop(workflow_id, None)
+        if key is not None:
+            self._graphs.pop(key, None)
+
+
+graph_cache = GraphCache(settings.GRAPH_CACHE_MAX_ENTRIES)
@@ -0,0 +1,40 @@
+import ast
+from typing import Any, Callable, Dict
+
+# Names an edge condition may reference; bound from the source node's result
+CONDITION_NAMES = ("branch", "output")
+
+_ALLOWED = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.List,
+)
+
+Condition = Callable[[Dict[str, Any]], bool]
+
+
+def compile_condition(expr: str) -> Condition:
+    """
+    Compile an edge `when` expression such as "branch=='deep'" once.
+    Only comparisons, boolean operators and literals over CONDITION_NAMES
+    are accepted; anything else is rejected with ValueError.
+    """
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"invalid edge condition {expr!r}: {e.msg}")
+    for n in ast.walk(tree):
+        if not isinstance(n, _ALLOWED):
+            raise ValueError(f"invalid edge condition {expr!r}: {type(n).__name__} not allowed")
+        if isinstance(n, ast.Name) and n.id not in CONDITION_NAMES:
+            raise ValueError(f"invalid edge condition {expr!r}: unknown name {n.id!r}")
+    code = compile(tree, "<when>", "eval")
+
+    def evaluate(result: Dict[str, Any]) -> bool:
+        scope = {name: result.get(name) for name in CONDITION_NAMES}
+        try:
+            return bool(eval(code, {"__builtins__": {}}, scope))
+        except Exception:
+            return False
+
+    return evaluate
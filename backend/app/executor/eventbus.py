@@ -0,0 +1,173 @@
+import asyncio, json
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, AsyncIterator, DefaultDict, Deque, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.redis import get_redis
+
+
+class EventBus(ABC):
+    """
+    Live trace-event transport between the process running a workflow and
+    the API processes serving SSE. Every event gets an id; subscribers can
+    resume after a given id (SSE Last-Event-ID). subscribe() yields None
+    whenever nothing arrived for `idle` seconds so callers can heartbeat.
+    """
+
+    def __init__(self):
+        self.active_subscribers = 0
+
+    @abstractmethod
+    async def publish(self, run_id: str, event: Dict[str, Any]) -> str:
+        """Append an event to the run's stream; returns its id"""
+
+    @abstractmethod
+    def subscribe(
+        self, run_id: str, last_event_id: Optional[str] = None, idle: float = 15.0
+    ) -> AsyncIterator[Optional[Tuple[str, Dict[str, Any]]]]:
+        """(event_id, event) after last_event_id, then live; None after `idle` quiet seconds"""
+
+    def stats(self) -> Dict[str, int]:
+        return {"subscribers": self.active_subscribers}
+
+
+class InMemoryEventBus(EventBus):
+    """
+    Single-process bus for tests and local development. Each subscriber gets a
+    bounded buffer; a slow consumer loses its oldest undelivered events rather
+    than blocking publishers or growing without bound. History is kept for the
+    max_runs most recently published runs only.
+    """
+
+    def __init__(self, history: int, buffer: int, max_runs: int):
+        super().__init__()
+        self.history = history
+        self.buffer = buffer
+        self.max_runs = max_runs
+        self.dropped = 0
+        self._seq: Dict[str, int] = {}
+        # least recently published run first
+        self._log: "OrderedDict[str, Deque[Tuple[int, Dict[str, Any]]]]" = OrderedDict()
+        self._subscribers: DefaultDict[str, List[asyncio.Queue]] = defaultdict(list)
+
+    def _evict(self) -> None:
+        # runs with live subscribers are kept so their sequence stays monotonic
+        for run_id in list(self._log):
+            if len(self._log) <= self.max_runs:
+                break
+            if run_id not in self._subscribers:
+                del self._log[run_id]
+                del self._seq[run_id]
+
+    async def publish(self, run_id: str, event: Dict[str, Any]) -> str:
+        seq = self._seq[run_id] = self._seq.get(run_id, 0) + 1
+        log = self._log.get(run_id)
+        if log is None:
+            log = self._log[run_id] = deque(maxlen=self.history)
+            self._evict()
+        else:
+            self._log.move_to_end(run_id)
+        log.append((seq, event))
+        for q in self._subscribers.get(run_id, []):
+            if q.full():
+                q.get_nowait()
+                self.dropped += 1
+            q.put_nowait((seq, event))
+        return str(seq)
+
+    async def subscribe(self, run_id: str, last_event_id: Optional[str] = None, idle: float = 15.0):
+        last = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+        q: asyncio.Queue = asyncio.Queue(maxsize=self.buffer)
+        self._subscribers[run_id].append(q)
+        self.active_subscribers += 1
+        try:
+            for seq, event in list(self._log.get(run_id, ())):
+                if seq > last:
+                    last = seq
+                    yield str(seq), event
+            while True:
+                try:
+                    seq, event = await asyncio.wait_for(q.get(), idle)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if seq > last:
+                    last = seq
+                    yield str(seq), event
+        finally:
+            self.active_subscribers -= 1
+            self._subscribers[run_id].remove(q)
+            if not self._subscribers[run_id]:
+                del self._subscribers[run_id]
+
+    def stats(self) -> Dict[str, int]:
+        depths = [q.qsize() for qs in self._subscribers.values() for q in qs]
+        return {
+            "subscribers": self.active_subscribers,
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped": self.dropped,
+            "runs": len(self._log),
+        }
+
+
+class RedisStreamEventBus(EventBus):
+    """One capped Redis Stream per run, shared by all workers and API replicas"""
+
+    def __init__(self, history: int, ttl_seconds: int):
+        super().__init__()
+        self.history = history
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(run_id: str) -> str:
+        return f"flowtrace:events:{run_id}"
+
+    async def publish(self, run_id: str, event: Dict[str, Any]) -> str:
+        redis = get_redis()
+        key = self._key(run_id)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.xadd(key, {"data": json.dumps(event, default=str)}, maxlen=self.history, approximate=True)
+            pipe.expire(key, self.ttl_seconds)
+            event_id, _ = await pipe.execute()
+        return event_id.decode() if isinstance(event_id, bytes) else event_id
+
+    async def subscribe(self, run_id: str, last_event_id: Optional[str] = None, idle: float = 15.0):
+        # pull-based: each read is bounded by `count`, so a slow consumer
+        # simply reads further behind instead of buffering in this process
+        redis = get_redis()
+        key = self._key(run_id)
+        last = last_event_id or "0-0"
+        self.active_subscribers += 1
+        try:
+            while True:
+                resp = await redis.xread({key: last}, count=100, block=int(idle * 1000))
+                if not resp:
+                    yield None
+                    continue
+                for _, entries in resp:
+                    for event_id, fields in entries:
+                        last = event_id.decode() if isinstance(event_id, bytes) else event_id
+                        yield last, json.loads(fields[b"data"])
+        finally:
+            self.active_subscribers -= 1
+
+
+_bus: Optional[EventBus] = None
+
+def get_event_bus() -> EventBus:
+    global _bus
+    if _bus is None:
+        if settings.EVENT_BUS_BACKEND == "memory":
+            _bus = InMemoryEventBus(
+                settings.EVENT_BUS_HISTORY, settings.SSE_SUBSCRIBER_BUFFER, settings.EVENT_BUS_MAX_RUNS
+            )
+        elif settings.EVENT_BUS_BACKEND == "redis":
+            _bus = RedisStreamEventBus(settings.EVENT_BUS_HISTORY, settings.EVENT_BUS_TTL_SECONDS)
+        else:
+            raise ValueError(f"Unsupported event bus backend: {settings.EVENT_BUS_BACKEND}")
+    return _bus
+
+def set_event_bus(bus: EventBus) -> None:
+    global _bus
+    _bus = bus
@@ -0,0 +1,39 @@
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from app.core.config import settings
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per (provider, model)"""
+
+    def __init__(self, window: int, min_samples: int):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+
+    def observe(self, provider: str, model: str, latency_ms: float) -> None:
+        self._samples.setdefault((provider, model), deque(maxlen=self.window)).append(latency_ms)
+
+    def percentile(self, provider: str, model: str, q: float) -> Optional[float]:
+        samples = self._samples.get((provider, model))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+latency_tracker = LatencyTracker(settings.LLM_HEDGE_WINDOW, settings.LLM_HEDGE_MIN_SAMPLES)
+
+
+def hedge_delay(provider: str, model: str, policy: Any) -> Optional[float]:
+    """
+    Seconds to wait on the primary before also firing the fallback, or None
+    when hedging is off. policy is the node's config.hedge: true, or a dict
+    with an explicit "after_ms"; otherwise the observed p95 latency is used.
+    """
+    if not policy:
+        return None
+    if isinstance(policy, dict) and policy.get("after_ms") is not None:
+        return float(policy["after_ms"]) / 1000
+    p95 = latency_tracker.percentile(provider, model, 0.95)
+    return (p95 if p95 is not None else settings.LLM_HEDGE_DEFAULT_DELAY_MS) / 1000
@@ -0,0 +1,36 @@
+from typing import Optional
+
+
+class LimitExceeded(Exception):
+    """A workflow limit (maxNodes, maxTokens, maxCostCents, timeoutSeconds) was hit"""
+
+
+class RunBudget:
+    """
+    Running token / cost totals for one run. LLM nodes reserve their prompt
+    tokens before calling the provider, so concurrent nodes cannot jointly
+    overshoot maxTokens; the reservation is replaced by the real usage after.
+    """
+
+    def __init__(self, max_tokens: int, max_cost_cents: Optional[int] = None):
+        self.max_tokens = max_tokens
+        self.max_cost_cents = max_cost_cents
+        self.tokens = 0
+        self.cost_cents = 0
+        self.reserved = 0
+
+    def reserve(self, tokens: int) -> None:
+        if self.tokens + self.reserved + tokens > self.max_tokens:
+            raise LimitExceeded(
+                f"maxTokens {self.max_tokens} exceeded: {self.tokens} used, {tokens} more requested"
+            )
+        if self.max_cost_cents is not None and self.cost_cents >= self.max_cost_cents:
+            raise LimitExceeded(f"maxCostCents {self.max_cost_cents} exceeded: {self.cost_cents} spent")
+        self.reserved += tokens
+
+    def release(self, tokens: int) -> None:
+        self.reserved -= tokens
+
+    def charge(self, tokens: int, cost_cents: int) -> None:
+        self.tokens += tokens
+        self.cost_cents += cost_cents
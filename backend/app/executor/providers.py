@@ -1,11 +1,19 @@
-import os
-from typing import Dict, Any, Tuple, Optional
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio, os, random, time
+from typing import Awaitable, Callable, Dict, Any, Tuple, Optional
+from app.core import metrics
 from app.core.config import settings
-from app.executor.tracing import emit_event
+from app.core.pricing import estimate_cost_cents
+from app.executor.clients import client_registry
+from app.executor.hedging import hedge_delay, latency_tracker
+from app.executor.ratelimit import rate_limiter
+from app.executor.replay import replay_archive
+from app.executor.resilience import call_with_retries
+from app.executor.tokens import count_tokens, usage_tokens
+from app.executor.tracing import DeltaCoalescer, emit_event
 from sqlalchemy.ext.asyncio import AsyncSession
 
+OnDelta = Callable[[str], Awaitable[None]]
+
 
 async def call_llm(
     db: AsyncSession,
@@ -15,101 +23,284 @@ async def call_llm(
     model: str,
     system: str,
     prompt: str,
-    temperature: float = 0.0
-) -> Tuple[str, Dict[str, int], str]:
+    temperature: float = 0.0,
+    stream: bool = False,
+    hedge: Any = None
+) -> Tuple[str, Dict[str, int], str, str]:
     """
     Call LLM provider with fallback support.
+    With stream=True the completion is streamed and emitted as coalesced
+    `llm.delta` events while it is generated.
+    With a hedge policy (see hedging.hedge_delay) the fallback is also fired
+    when the primary is slow, and whichever answers first wins.
 
     Returns:
-        Tuple of (response_text, token_counts, provider_used)
-        token_counts: {"input": int, "output": int, "total": int}
+        Tuple of (response_text, token_counts, provider_used, model_used)
+        token_counts: {"input": int, "output": int, "total": int}, plus
+        "extra_cost_cents" for abandoned hedged attempts
     """
+    deltas = DeltaCoalescer(db, run_id, step_id, settings.LLM_DELTA_MIN_CHARS, settings.LLM_DELTA_MAX_DELAY_SECONDS) if stream else None
+    if provider == "mock":
+        fallback_provider = "mock"
+    else:
+        fallback_provider = "gemini" if provider == "openai" else "openai"
+    fallback_model = _get_fallback_model(fallback_provider, model)
+
+    async def attempt(target: Tuple[str, str]) -> Tuple[str, Dict[str, int]]:
+        # transient errors are retried with backoff; an open circuit fails fast
+        p, m = target
+
+        async def call() -> Tuple[str, Dict[str, int]]:
+            if deltas is None:
+                return await _call_provider(p, m, system, prompt, temperature)
+            # each try streams as its own attempt; a failed one is retracted
+            n = deltas.new_attempt()
+            try:
+                return await _call_provider(p, m, system, prompt, temperature, lambda text: deltas.add(p, n, text))
+            except BaseException:
+                await deltas.discard(n, p)
+                raise
+
+        async def on_retry(n: int, delay: float, error: BaseException) -> None:
+            await emit_event(db, run_id, step_id, "retry", {
+                "provider": p, "model": m, "attempt": n, "delay_ms": int(delay * 1000), "error": str(error)
+            })
+
+        t0 = time.perf_counter()
+        outcome = "error"
+        try:
+            with metrics.span("call_llm", provider=p, model=m):
+                result = await call_with_retries(p, m, call, on_retry)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "canceled"
+            raise
+        finally:
+            metrics.llm_call_duration.labels(p, m, outcome).observe(time.perf_counter() - t0)
+            if deltas:
+                await deltas.flush()
+
+    delay = hedge_delay(provider, model, hedge)
     try:
-        response, tokens = await _call_provider(provider, model, system, prompt, temperature)
-        return response, tokens, provider
+        if delay is None:
+            response, tokens = await attempt((provider, model))
+            return response, tokens, provider, model
+        return await _call_hedged(
+            db, run_id, step_id, attempt, (provider, model), (fallback_provider, fallback_model),
+            delay, count_tokens(provider, model, system + prompt)
+        )
+    except HedgeFailed:
+        raise
     except Exception as primary_error:
-        fallback_provider = "gemini" if provider == "openai" else "openai"
-        fallback_model = _get_fallback_model(fallback_provider, model)
         await emit_event(db, run_id, step_id, "log", {
             "msg": f"Primary provider {provider} failed, trying {fallback_provider}",
             "error": str(primary_error)
         })
         try:
-            response, tokens = await _call_provider(
-                fallback_provider, fallback_model, system, prompt, temperature
-            )
+            response, tokens = await attempt((fallback_provider, fallback_model))
             await emit_event(
                 db, run_id, step_id, "log",
                 {
                     "msg": f"Fallback provider {fallback_provider} succeeded",
                 }
             )
-            return response, tokens, fallback_provider
+            return response, tokens, fallback_provider, fallback_model
         except Exception as fallback_error:
             error_msg = f"Fallback provider {fallback_provider} failed: {str(fallback_error)}"
             raise Exception(error_msg)
 
+
+class HedgeFailed(Exception):
+    """Both the primary and the hedged fallback attempt failed"""
+
+
+async def _call_hedged(
+    db: AsyncSession,
+    run_id: str,
+    step_id: Optional[str],
+    attempt: Callable[[Tuple[str, str]], Awaitable[Tuple[str, Dict[str, int]]]],
+    primary: Tuple[str, str],
+    backup: Tuple[str, str],
+    delay: float,
+    prompt_tokens: int
+) -> Tuple[str, Dict[str, int], str, str]:
+    """
+    Give the primary `delay` seconds, then race it against the backup.
+    If the primary fails within the delay its error is raised so the caller
+    takes the normal fallback path.
+    """
+    first = asyncio.create_task(attempt(primary))
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        response, tokens = first.result()
+        return response, tokens, primary[0], primary[1]
+
+    await emit_event(db, run_id, step_id, "log", {
+        "msg": f"Primary provider {primary[0]} slower than {int(delay * 1000)}ms, hedging with {backup[0]}"
+    })
+    tasks = {first: primary, asyncio.create_task(attempt(backup)): backup}
+    pending = set(tasks)
+    winner = None
+    errors = []
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None and winner is None:
+                    winner = t
+                elif t.exception() is not None:
+                    errors.append(f"{tasks[t][0]}: {t.exception()}")
+    finally:
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if winner is None:
+        raise HedgeFailed(f"Hedged providers failed: {'; '.join(errors)}")
+
+    # the losing request was still billed for whatever it consumed
+    loser = next(t for t in tasks if t is not winner)
+    loser_provider, loser_model = tasks[loser]
+    response, tokens = winner.result()
+    if loser.cancelled():
+        status = "cancelled"
+        loser_cost = estimate_cost_cents(loser_provider, loser_model, prompt_tokens, 0)
+    elif loser.exception() is None:
+        status = "succeeded"
+        lt = loser.result()[1]
+        loser_cost = estimate_cost_cents(loser_provider, loser_model, lt["input"], lt["output"])
+    else:
+        status = "failed"
+        loser_cost = 0
+    await emit_event(db, run_id, step_id, "llm.hedge", {
+        "winner": {"provider": tasks[winner][0], "model": tasks[winner][1]},
+        "loser": {"provider": loser_provider, "model": loser_model, "status": status},
+        "loser_cost_cents": loser_cost,
+    })
+    tokens = {**tokens, "extra_cost_cents": loser_cost}
+    return response, tokens, tasks[winner][0], tasks[winner][1]
+
 async def _call_provider(
     provider: str,
     model: str,
     system: str,
     prompt: str,
-    temperature: float
+    temperature: float,
+    on_delta: Optional[OnDelta] = None
 ) -> Tuple[str, Dict[str, int]]:
-    """Call specific LLM Provider"""
+    """Call specific LLM Provider, queued behind its rate limits (or answered from the replay archive)"""
     if provider == "openai":
-        return await _call_openai(model, system, prompt, temperature)
+        call = _call_openai
     elif provider == "gemini":
-        return await _call_gemini(model, system, prompt, temperature)
+        call = _call_gemini
+    elif provider == "mock":
+        call = _call_mock
     else:
         raise ValueError(f"Unsupported provider: {provider}")
+    if replay_archive.mode == "replay":
+        return await replay_archive.replay(provider, model, system, prompt, on_delta)
+    async with rate_limiter.limit(provider, model, count_tokens(provider, model, system + prompt)) as limiter:
+        t0 = time.perf_counter()
+        response, tokens = await call(model, system, prompt, temperature, on_delta)
+        latency_ms = (time.perf_counter() - t0) * 1000
+        latency_tracker.observe(provider, model, latency_ms)
+        if limiter is not None:
+            await limiter.debit(tokens["output"])
+    if replay_archive.mode == "record":
+        await replay_archive.record(provider, model, system, prompt, response, tokens, latency_ms)
+    return response, tokens
 
 async def _call_openai(
     model: str,
     system: str,
     prompt: str,
-    temperature: float
+    temperature: float,
+    on_delta: Optional[OnDelta] = None
 ) -> Tuple[str, Dict[str, int]]:
     """Call OpenAI API"""
     if not settings.OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY is not set")
-    llm = ChatOpenAI(
-        model=model,
-        temperature=temperature,
-        api_key=settings.OPENAI_API_KEY,
-    )
+    llm = client_registry.get("openai", model, temperature)
     messages = []
     if system:
         messages.append({"role": "system", "content": system})
     messages.append({"role": "user", "content": prompt})
-    response = await llm.ainvoke(messages)
-    input_tokens = _estimate_tokens(system + prompt)
-    output_tokens = _estimate_tokens(response.content)
-    return response.content, {
-        "input": input_tokens,
-        "output": output_tokens,
-        "total": input_tokens + output_tokens
-    }
+    content, usage = await _invoke(llm, messages, on_delta)
+    return content, _token_counts("openai", model, system + prompt, content, usage)
 
 async def _call_gemini(
     model: str,
     system: str,
     prompt: str,
-    temperature: float
+    temperature: float,
+    on_delta: Optional[OnDelta] = None
 ) -> Tuple[str, Dict[str, int]]:
     """Call Google Gemini API"""
     if not settings.GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY not set")
-    llm = ChatGoogleGenerativeAI(
-        model=model,
-        temperature=temperature,
-        google_api_key=settings.GEMINI_API_KEY
-    )
+    llm = client_registry.get("gemini", model, temperature)
     full_prompt = f"{system}\n\n{prompt}" if system else prompt
-    response = await llm.ainvoke(full_prompt)
-    input_tokens = _estimate_tokens(full_prompt)
-    output_tokens = _estimate_tokens(response.content)
-    return response.content, {
+    content, usage = await _invoke(llm, full_prompt, on_delta)
+    return content, _token_counts("gemini", model, full_prompt, content, usage)
+
+class MockProviderError(Exception):
+    status_code = 503
+
+async def _call_mock(
+    model: str,
+    system: str,
+    prompt: str,
+    temperature: float,
+    on_delta: Optional[OnDelta] = None
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Offline provider for benchmarks and local runs: answers after a normally
+    distributed latency and fails (as a retryable 503) at MOCK_LLM_ERROR_RATE.
+    """
+    latency = max(0.0, random.gauss(settings.MOCK_LLM_LATENCY_MS, settings.MOCK_LLM_LATENCY_JITTER_MS)) / 1000
+    if random.random() < settings.MOCK_LLM_ERROR_RATE:
+        await asyncio.sleep(latency)
+        raise MockProviderError("mock provider error")
+    words = ["mock"] * settings.MOCK_LLM_OUTPUT_TOKENS
+    if on_delta is None:
+        await asyncio.sleep(latency)
+    else:
+        chunks = [words[i:i + 8] for i in range(0, len(words), 8)]
+        for chunk in chunks:
+            await asyncio.sleep(latency / len(chunks))
+            await on_delta(" ".join(chunk) + " ")
+    content = " ".join(words)
+    return content, _token_counts("mock", model, system + prompt, content, None)
+
+async def _invoke(llm, messages: Any, on_delta: Optional[OnDelta]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    ainvoke, or astream with each chunk handed to on_delta.
+    Returns the text and the provider's usage metadata, if it sent any.
+    """
+    if on_delta is None:
+        response = await llm.ainvoke(messages)
+        return response.content, getattr(response, "usage_metadata", None)
+    parts = []
+    usage = None
+    async for chunk in llm.astream(messages):
+        if chunk.content:
+            parts.append(chunk.content)
+            await on_delta(chunk.content)
+        if getattr(chunk, "usage_metadata", None):
+            # usage usually arrives on the final chunk
+            usage = chunk.usage_metadata
+    return "".join(parts), usage
+
+def _token_counts(provider: str, model: str, prompt: str, completion: str, usage: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Provider-reported usage when present, otherwise counted locally"""
+    tokens = usage_tokens(usage)
+    if tokens is not None:
+        return tokens
+    input_tokens = count_tokens(provider, model, prompt)
+    output_tokens = count_tokens(provider, model, completion)
+    return {
         "input": input_tokens,
         "output": output_tokens,
         "total": input_tokens + output_tokens
@@ -142,10 +333,3 @@ def _get_fallback_model(fallback_provider: str, original_model: str) -> str:
         else:
             return "gpt-5-fast"
     return original_model
-
-def _estimate_tokens(text: str) -> int:
-    """
-    Simple token estimation: ~4 characters per token
-    For production, use tiktoken or similar
-    """
-    return len(text) // 4
\ No newline at end of file
@@ -0,0 +1,113 @@
+import asyncio, time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.rate_limits import get_rate_limit
+from app.core.redis import get_redis
+
+# Reserve `amount` from a bucket refilled continuously at capacity/window;
+# the balance may go negative, and the caller waits until it is repaid.
+# Returns the wait in milliseconds.
+_RESERVE_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local amount = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+tokens = tokens - amount
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate) + 1000)
+if tokens >= 0 then return 0 end
+return math.ceil(-tokens / rate)
+"""
+
+
+class TokenBucket:
+    """Local reservation-style token bucket: callers queue in arrival order"""
+
+    def __init__(self, capacity: int, window_seconds: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / window_seconds
+        self.tokens = float(capacity)
+        self.ts = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+        self.tokens -= min(amount, self.capacity)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class ProviderLimiter:
+    """Concurrency cap plus requests/min and tokens/min buckets for one provider/model"""
+
+    def __init__(self, provider: str, model: str, limits: Dict[str, int], shared: bool):
+        self.key = f"flowtrace:rl:{provider}:{model}"
+        self.limits = limits
+        self.shared = shared
+        self.semaphore = asyncio.Semaphore(limits["concurrency"])
+        self.buckets = {"rpm": TokenBucket(limits["rpm"]), "tpm": TokenBucket(limits["tpm"])}
+
+    async def _reserve(self, kind: str, amount: float) -> float:
+        if self.shared:
+            try:
+                capacity = self.limits[kind]
+                amount = min(amount, capacity)
+                wait_ms = await get_redis().eval(
+                    _RESERVE_LUA, 1, f"{self.key}:{kind}", capacity, capacity / 60000.0, amount
+                )
+                return int(wait_ms) / 1000.0
+            except Exception:
+                pass  # Redis unavailable: fall back to the local bucket
+        return self.buckets[kind].reserve(amount)
+
+    async def acquire(self, tokens: int) -> None:
+        wait = max(await self._reserve("rpm", 1), await self._reserve("tpm", tokens))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def debit(self, tokens: int) -> None:
+        """Charge tokens only known after the call (e.g. completion tokens)"""
+        if tokens > 0:
+            await self._reserve("tpm", tokens)
+
+
+class RateLimiter:
+    """Registry of ProviderLimiters; calls over the limit are queued, not failed"""
+
+    def __init__(self, shared: bool):
+        self.shared = shared
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get(self, provider: str, model: str) -> Optional[ProviderLimiter]:
+        # asyncio.Semaphore is bound to the loop that first waits on it
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._limiters.clear()
+            self._loop = loop
+        key = (provider, model)
+        if key not in self._limiters:
+            limits = get_rate_limit(provider, model)
+            if limits is None:
+                return None
+            self._limiters[key] = ProviderLimiter(provider, model, limits, self.shared)
+        return self._limiters[key]
+
+    @asynccontextmanager
+    async def limit(self, provider: str, model: str, tokens: int):
+        limiter = self._get(provider, model) if settings.LLM_RATE_LIMIT_ENABLED else None
+        if limiter is None:
+            yield None
+            return
+        async with limiter.semaphore:
+            await limiter.acquire(tokens)
+            yield limiter
+
+
+rate_limiter = RateLimiter(shared=settings.LLM_RATE_LIMIT_BACKEND == "redis")
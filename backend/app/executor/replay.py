@@ -0,0 +1,80 @@
+import asyncio, gzip, hashlib, json, os, threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+
+class ReplayMiss(LookupError):
+    """Replay mode got a request the archive has no recording for"""
+
+
+def replay_key(provider: str, model: str, system: str, prompt: str) -> str:
+    """Hash of the fields of the `llm.request` trace payload"""
+    raw = json.dumps([provider, model, system, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ReplayArchive:
+    """
+    Gzipped JSONL archive of provider calls. In "record" mode every call made
+    through providers._call_provider is appended; in "replay" mode calls are
+    answered from the archive with the recorded latency times latency_scale
+    and never reach the network. Repeated identical requests replay their
+    recordings in order, cycling when they run out.
+    """
+
+    def __init__(self, mode: str, path: str, latency_scale: float):
+        self.mode = mode
+        self.path = path
+        self.latency_scale = latency_scale
+        self._recordings: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._recordings is None:
+            recordings: Dict[str, List[Dict[str, Any]]] = {}
+            if os.path.exists(self.path):
+                with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        entry = json.loads(line)
+                        recordings.setdefault(entry["key"], []).append(entry)
+            self._recordings = recordings
+        return self._recordings
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        # each append is its own gzip member; gzip readers concatenate them
+        with self._lock, gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    async def record(
+        self, provider: str, model: str, system: str, prompt: str,
+        response: str, tokens: Dict[str, int], latency_ms: float
+    ) -> None:
+        entry = {
+            "key": replay_key(provider, model, system, prompt),
+            "provider": provider,
+            "model": model,
+            "response": response,
+            "tokens": tokens,
+            "latency_ms": round(latency_ms, 1),
+        }
+        await asyncio.to_thread(self._append, entry)
+
+    async def replay(
+        self, provider: str, model: str, system: str, prompt: str,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Tuple[str, Dict[str, int]]:
+        key = replay_key(provider, model, system, prompt)
+        entries = self._load().get(key)
+        if not entries:
+            raise ReplayMiss(f"no recording for {provider}/{model} request {key[:12]}")
+        n = self._served.get(key, 0)
+        self._served[key] = n + 1
+        entry = entries[n % len(entries)]
+        await asyncio.sleep(entry["latency_ms"] * self.latency_scale / 1000)
+        if on_delta is not None:
+            await on_delta(entry["response"])
+        return entry["response"], entry["tokens"]
+
+
+replay_archive = ReplayArchive(settings.LLM_REPLAY_MODE, settings.LLM_REPLAY_PATH, settings.LLM_REPLAY_LATENCY_SCALE)
@@ -0,0 +1,129 @@
+import asyncio, random, time
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import httpx
+from app.core.config import settings
+
+T = TypeVar("T")
+
+TRANSIENT_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Timeouts, connection failures, 429s and 5xx are worth retrying; anything
+    else (bad request, auth, unsupported model) fails the same way again.
+    SDK wrappers are unwrapped through __cause__ / __context__.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, CircuitOpen):
+            return False
+        if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError, httpx.TimeoutException, httpx.TransportError)):
+            return True
+        if type(exc).__name__ in ("APIConnectionError", "APITimeoutError", "ServerError"):
+            return True
+        status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+        if isinstance(status, int):
+            return status in TRANSIENT_STATUS
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive transient failures;
+    open -> half-open after `reset_seconds`, letting a single probe through;
+    the probe's outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """A probe ended without an outcome (e.g. cancelled); allow another"""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self, transient: bool) -> None:
+        self._probing = False
+        if not transient:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            return
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+# One breaker per (provider, model), shared by every run in the worker
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+def get_breaker(provider: str, model: str) -> CircuitBreaker:
+    key = (provider, model)
+    if key not in _breakers:
+        _breakers[key] = CircuitBreaker(settings.LLM_BREAKER_FAILURE_THRESHOLD, settings.LLM_BREAKER_RESET_SECONDS)
+    return _breakers[key]
+
+
+def backoff_delay(retry: int) -> float:
+    """Full-jitter exponential backoff for the n-th retry (1-based)"""
+    cap = min(settings.LLM_RETRY_MAX_DELAY_SECONDS, settings.LLM_RETRY_BASE_DELAY_SECONDS * 2 ** (retry - 1))
+    return random.uniform(0, cap)
+
+
+async def call_with_retries(
+    provider: str,
+    model: str,
+    fn: Callable[[], Awaitable[T]],
+    on_retry: Optional[Callable[[int, float, BaseException], Awaitable[None]]] = None,
+) -> T:
+    """Run fn behind the provider's circuit breaker, retrying transient failures"""
+    breaker = get_breaker(provider, model)
+    attempts = max(1, settings.LLM_RETRY_ATTEMPTS)
+    for n in range(1, attempts + 1):
+        if not breaker.allow():
+            raise CircuitOpen(f"circuit open for {provider}/{model}")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            transient = is_transient(e)
+            breaker.record_failure(transient)
+            if not transient or n == attempts:
+                raise
+            delay = backoff_delay(n)
+            if on_retry is not None:
+                await on_retry(n, delay, e)
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
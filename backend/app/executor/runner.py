@@ -1,17 +1,29 @@
 import asyncio, time
-from typing import Dict, Any
+from collections import deque
+from typing import Awaitable, Callable, Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import insert, update, select
-from app.schemas.workflow_schema import WorkflowSpec
-from app.executor.compiler import compile_graph
-from app.executor.tracing import emit_event
+from sqlalchemy.sql import func
+from app.executor.compiler import CompiledGraph
+from app.executor.templates import Template, compile_template
+from app.executor.tracing import emit_event, trace_sink
 from app.executor.providers import call_llm
+from app.executor.cache import cache_key, llm_cache
+from app.executor.limits import LimitExceeded, RunBudget
+from app.executor.totals import RunTotals, run_totals
+from app.executor.tokens import count_tokens
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import async_session
 from app.models.workflow_runs import WorkflowRun
 from app.models.run_steps import RunStep
 from app.core.pricing import estimate_cost_cents
 
 # Placeholder handlers (wire LLM/tools later)
-async def handle_llm(db: AsyncSession, run_id: str, step_id: str, node, ctx: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_llm(
+    db: AsyncSession, run_id: str, step_id: str, node, ctx: Dict[str, Any],
+    budget: Optional[RunBudget] = None, template: Optional[Template] = None
+) -> Dict[str, Any]:
     """Handle LLM node execution with real API calls"""
     # Get node config - update default to new model
     provider = node.config.get("provider", "openai")
@@ -20,7 +32,7 @@ async def handle_llm(db: AsyncSession, run_id: str, step_id: str, node, ctx: Dic
     temperature = float(node.config.get("temperature", 0.0))
     
     # Render inputs (get prompt text)
-    rendered_inputs = _render_inputs(node.inputs, ctx)
+    rendered_inputs = _render_inputs(node.inputs, ctx, template)
     prompt = rendered_inputs.get("text", "") if isinstance(rendered_inputs, dict) else str(rendered_inputs)
     
     # Emit request event
@@ -30,52 +42,128 @@ async def handle_llm(db: AsyncSession, run_id: str, step_id: str, node, ctx: Dic
         "system": system,
         "prompt": prompt
     })
+
+    # Exact-match cache; nodes can opt out with config.cache = false
+    use_cache = settings.LLM_CACHE_ENABLED and node.config.get("cache", True)
+    key = cache_key(provider, model, system, prompt, temperature)
+    if use_cache:
+        cached = await llm_cache.get(key)
+        metrics.llm_cache_requests.labels("hit" if cached is not None else "miss").inc()
+        if cached is not None:
+            await emit_event(db, run_id, step_id, "cache.hit", {
+                "key": key,
+                "provider": cached["provider"],
+                "model": model,
+                "tokens": (cached["prompt_tokens"], cached["completion_tokens"]),
+                "cost_cents": 0
+            })
+            return {
+                "output": cached["output"],
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "provider": cached["provider"],
+                "model": cached.get("model", model),
+                "cached": True,
+            }
     
+    # Pre-flight budget check (cache hits above cost nothing)
+    reserved = count_tokens(provider, model, system + prompt) if budget is not None else 0
+    if budget is not None:
+        budget.reserve(reserved)
+
     # Call LLM with fallback
-    response_text, token_counts, provider_used = await call_llm(
-        db=db,
-        run_id=run_id,
-        step_id=step_id,
-        provider=provider,
-        model=model,
-        system=system,
-        prompt=prompt,
-        temperature=temperature
-    )
+    try:
+        response_text, token_counts, provider_used, model_used = await call_llm(
+            db=db,
+            run_id=run_id,
+            step_id=step_id,
+            provider=provider,
+            model=model,
+            system=system,
+            prompt=prompt,
+            temperature=temperature,
+            stream=bool(node.config.get("stream", settings.LLM_STREAM_DEFAULT)),
+            hedge=node.config.get("hedge")
+        )
+    finally:
+        if budget is not None:
+            budget.release(reserved)
+
+    if use_cache:
+        await llm_cache.set(key, {
+            "output": response_text,
+            "prompt_tokens": token_counts["input"],
+            "completion_tokens": token_counts["output"],
+            "provider": provider_used,
+            "model": model_used,
+        })
     
     return {
         "output": response_text,
         "prompt_tokens": token_counts["input"],
         "completion_tokens": token_counts["output"],
         "provider": provider_used,
-        "model": model,
+        "model": model_used,
+        "extra_cost_cents": token_counts.get("extra_cost_cents", 0),
     }
 
 async def handle_tool(node, ctx) -> Dict[str, Any]:
     await asyncio.sleep(0.05)
     return {"output": {"ok": True, "echo": node.config}}
 
-async def handle_router(node, ctx) -> Dict[str, Any]:
+async def handle_router(node, ctx, template: Optional[Template] = None) -> Dict[str, Any]:
     # Extremely simple: compute len of provided text; set branch
-    text = _render_inputs(node.inputs, ctx)
+    text = _render_inputs(node.inputs, ctx, template)
     rule = node.config.get("rule", "")
     branch = "deep" if len(str(text)) > 2000 else "shallow"
     return {"branch": branch, "output": branch}
 
-def _render_inputs(inputs: Dict[str, Any], ctx: Dict[str, Any]) -> str:
-    # minimal renderer: if there's a single key 'text', try basic template
+def _render_inputs(inputs: Dict[str, Any], ctx: Dict[str, Any], template: Optional[Template] = None) -> str:
+    # minimal renderer: if there's a single key 'text', try basic template;
+    # nodes of a compiled graph pass their precompiled CompiledGraph.templates entry
+    if template is not None:
+        return template.render(ctx)
     val = inputs.get("text", "")
-    return str(_resolve_template(val, ctx))
+    return _resolve_template(val, ctx) if isinstance(val, str) else str(val)
 
 def _resolve_template(template: str, ctx: Dict[str, Any]) -> str:
-    # naive: allow {{node.<id>.output}} lookups only
-    out = template
-    # very simple resolve (not full mustache)
-    for k, v in ctx.items():
-        out = out.replace("{{" + k + "}}", str(v))
-    return out
-
-async def execute_node(db: AsyncSession, run_id: str, node, ctx: Dict[str, Any]) -> None:
+    # {{node.<id>.output}} plus nested paths, e.g. {{node.<id>.output.content}};
+    # one-off templates only, parsed through compile_template's cache
+    return compile_template(template).render(ctx)
+
+async def execute_node(
+    run_id: str, node, ctx: Dict[str, Any], budget: Optional[RunBudget] = None,
+    totals: Optional[RunTotals] = None, template: Optional[Template] = None
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    status = "failed"
+    try:
+        with metrics.span("execute_node", run_id=run_id, node_id=node.id, node_type=node.type):
+            # each node gets its own session: concurrent nodes must never share one
+            async with async_session() as db:
+                result = await _execute_node(db, run_id, node, ctx, budget, totals, template)
+        status = "succeeded"
+        return result
+    except asyncio.CancelledError:
+        status = "canceled"
+        raise
+    finally:
+        metrics.node_duration.labels(node.type, status).observe(time.perf_counter() - t0)
+
+async def skip_node(run_id: str, node) -> None:
+    """Record a node that no active edge reaches"""
+    async with async_session() as db:
+        step = await db.execute(insert(RunStep).values(
+            run_id=run_id, node_id=node.id, node_type=node.type, status="skipped", latency_ms=0, finished_at=func.now()
+        ).returning(RunStep.id))
+        step_id = str(step.scalar_one())
+        await db.commit()
+        await emit_event(db, run_id, step_id, "log", {"msg": f"skip {node.type}:{node.id}"})
+
+async def _execute_node(
+    db: AsyncSession, run_id: str, node, ctx: Dict[str, Any],
+    budget: Optional[RunBudget] = None, totals: Optional[RunTotals] = None, template: Optional[Template] = None
+) -> Dict[str, Any]:
     # create step row
     step = await db.execute(insert(RunStep).values(
         run_id=run_id, node_id=node.id, node_type=node.type, status="running"
@@ -88,15 +176,22 @@ async def execute_node(db: AsyncSession, run_id: str, node, ctx: Dict[str, Any])
         await emit_event(db, run_id, step_id, "log", {"msg": f"start {node.type}:{node.id}"})
         if node.type == "llm":
             # Pass db, run_id, step_id to handle_llm
-            result = await handle_llm(db, run_id, step_id, node, ctx)
+            result = await handle_llm(db, run_id, step_id, node, ctx, budget, template)
             cost = estimate_cost_cents(result["provider"], result["model"], result["prompt_tokens"], result["completion_tokens"])
+            cost += result.get("extra_cost_cents", 0)
+            if budget is not None:
+                budget.charge(result["prompt_tokens"] + result["completion_tokens"], cost)
+            if totals is not None:
+                totals.add(result["prompt_tokens"] + result["completion_tokens"], cost)
             ctx[f"node.{node.id}.output"] = result["output"]
             await db.execute(update(RunStep).where(RunStep.id==step_id).values(
                 status="succeeded",
                 latency_ms=int((time.perf_counter()-t0)*1000),
+                finished_at=func.now(),
                 tokens_input=result["prompt_tokens"],
                 tokens_output=result["completion_tokens"],
-                cost_cents=cost
+                cost_cents=cost,
+                output=result["output"]
             ))
             await emit_event(db, run_id, step_id, "llm.response", {
                 "output": result["output"], 
@@ -110,65 +205,187 @@ async def execute_node(db: AsyncSession, run_id: str, node, ctx: Dict[str, Any])
             await db.execute(update(RunStep).where(RunStep.id==step_id).values(
                 status="succeeded",
                 latency_ms=int((time.perf_counter()-t0)*1000),
+                finished_at=func.now(),
+                output=result["output"]
             ))
             await emit_event(db, run_id, step_id, "tool.response", {"output": result["output"]})
         elif node.type == "router":
-            result = await handle_router(node, ctx)
+            result = await handle_router(node, ctx, template)
             ctx["branch"] = result["branch"]
             ctx[f"node.{node.id}.output"] = result["output"]
             await db.execute(update(RunStep).where(RunStep.id==step_id).values(
                 status="succeeded",
                 latency_ms=int((time.perf_counter()-t0)*1000),
+                finished_at=func.now(),
+                output=result["output"]
             ))
             await emit_event(db, run_id, step_id, "log", {"branch": result["branch"]})
         else:
             raise ValueError(f"unknown node type {node.type}")
         await db.commit()
+        return result
+    except asyncio.CancelledError:
+        # cancelled because another node failed or the run was stopped
+        await db.rollback()
+        await db.execute(update(RunStep).where(RunStep.id==step_id).values(
+            status="canceled",
+            latency_ms=int((time.perf_counter()-t0)*1000),
+            finished_at=func.now(),
+        ))
+        await db.commit()
+        raise
     except Exception as e:
+        await db.rollback()
         await db.execute(update(RunStep).where(RunStep.id==step_id).values(
             status="failed",
             latency_ms=int((time.perf_counter()-t0)*1000),
-            error=str(e)
+            finished_at=func.now(),
+            error_summary=str(e)
         ))
         await db.commit()
         await emit_event(db, run_id, step_id, "log", {"error": str(e)})
         raise
 
-async def run_workflow(db: AsyncSession, run_id: str, spec: WorkflowSpec) -> None:
-    comp = compile_graph(spec)
+async def _run_dag(
+    comp: CompiledGraph,
+    run_node: Callable[[Any], Awaitable[Dict[str, Any]]],
+    skip_node: Callable[[Any], Awaitable[None]],
+    max_concurrency: int,
+) -> None:
+    # ready-queue scheduling: a node is launched as soon as all of its predecessors
+    # have finished, instead of waiting for the whole previous level.
+    # Edges whose `when` is false are inactive; a node with incoming edges but no
+    # active one is skipped, which makes all of its outgoing edges inactive too.
+    pending: Dict[str, int] = {n: len(comp.rev[n]) for n in comp.nodes}
+    active: Dict[str, int] = {n: 0 for n in comp.nodes}
+    ready = deque(sorted(n for n, d in pending.items() if d == 0))
+    running: Dict[asyncio.Task, str] = {}
+
+    async def resolve(node_id: str, result: Optional[Dict[str, Any]]) -> None:
+        resolved = [(node_id, result)]
+        while resolved:
+            u, res = resolved.pop()
+            for v in comp.adj[u]:
+                pending[v] -= 1
+                cond = comp.conditions.get((u, v))
+                if res is not None and (cond is None or cond(res)):
+                    active[v] += 1
+                if pending[v] == 0:
+                    if active[v] > 0:
+                        ready.append(v)
+                    else:
+                        await skip_node(comp.nodes[v])
+                        resolved.append((v, None))
+
+    try:
+        while ready or running:
+            while ready and len(running) < max_concurrency:
+                node_id = ready.popleft()
+                running[asyncio.create_task(run_node(comp.nodes[node_id]))] = node_id
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                node_id = running.pop(t)
+                await resolve(node_id, t.result())  # t.result() re-raises node failure
+    finally:
+        # on failure, stop whatever is still in flight
+        for t in running:
+            t.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+async def run_workflow(db: AsyncSession, run_id: str, comp: CompiledGraph, resume: bool = False) -> None:
+    async with trace_sink(run_id):
+        await _run_workflow(db, run_id, comp, resume)
+
+async def _load_checkpoints(db: AsyncSession, run_id: str, comp: CompiledGraph) -> Dict[str, Dict[str, Any]]:
+    """Results of the nodes that already succeeded in this run, by node id"""
+    rows = (await db.execute(select(RunStep.node_id, RunStep.node_type, RunStep.output).where(
+        RunStep.run_id==run_id, RunStep.status=="succeeded", RunStep.output.isnot(None)
+    ))).all()
+    done: Dict[str, Dict[str, Any]] = {}
+    for node_id, node_type, output in rows:
+        if node_id in comp.nodes:
+            done[node_id] = {"output": output, "branch": output} if node_type == "router" else {"output": output}
+    return done
+
+async def _restore_node(node, result: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+    ctx[f"node.{node.id}.output"] = result["output"]
+    if node.type == "router":
+        ctx["branch"] = result["branch"]
+    return result
+
+async def _run_workflow(db: AsyncSession, run_id: str, comp: CompiledGraph, resume: bool = False) -> None:
+    limits = comp.spec.limits
+    # resuming keeps succeeded nodes (their outputs are checkpointed on the step)
+    # and the totals they already paid for; everything else runs again
+    run = await db.get(WorkflowRun, run_id)
+    inputs = run.inputs or {}
+    attempt = run.attempt or 1
+    done: Dict[str, Dict[str, Any]] = {}
+    prior_tokens = prior_cost = prior_latency_ms = 0
+    if resume:
+        done = await _load_checkpoints(db, run_id, comp)
+        prior_tokens, prior_cost, prior_latency_ms = run.total_tokens or 0, run.total_cost_cents or 0, run.total_latency_ms or 0
+
     # mark run started
-    await db.execute(update(WorkflowRun).where(WorkflowRun.id==run_id).values(status="running"))
+    await db.execute(update(WorkflowRun).where(WorkflowRun.id==run_id).values(status="running", error_summary=None))
     await db.commit()
+    if resume:
+        await emit_event(db, run_id, None, "log", {"msg": "run resumed", "attempt": attempt, "restored_nodes": sorted(done)})
 
-    try:
-        ctx: Dict[str, Any] = {}
-        # execute level-by-level; within a level run concurrently
-        for level in comp.levels:
-            tasks = []
-            for node_id in level:
-                node = comp.nodes[node_id]
-                tasks.append(asyncio.create_task(execute_node(db, run_id, node, ctx)))
-            # wait a level
-            for t in tasks:
-                await t
-
-        # compute totals (basic roll-up)
-        from app.models.run_steps import RunStep
-        q = await db.execute(select(RunStep.tokens_input, RunStep.tokens_output, RunStep.cost_cents).where(RunStep.run_id==run_id))
-        tot_in = tot_out = tot_cost = 0
-        for ti, to, cc in q.all():
-            tot_in += ti or 0
-            tot_out += to or 0
-            tot_cost += cc or 0
+    error: Optional[Exception] = None
+    async with run_totals(run_id, prior_latency_ms) as totals:
+        try:
+            if len(comp.nodes) > limits.maxNodes:
+                raise LimitExceeded(f"maxNodes {limits.maxNodes} exceeded: workflow has {len(comp.nodes)} nodes")
+            ctx: Dict[str, Any] = {f"input.{k}": v for k, v in inputs.items()}
+            budget = RunBudget(limits.maxTokens, limits.maxCostCents)
+            budget.charge(prior_tokens, prior_cost)
+
+            def run_node(node):
+                if node.id in done:
+                    return _restore_node(node, done[node.id], ctx)
+                return execute_node(run_id, node, ctx, budget, totals, comp.templates.get(node.id))
+
+            deadline = asyncio.timeout(limits.timeoutSeconds)
+            try:
+                # run-wide deadline; in-flight nodes are cancelled when it expires
+                async with deadline:
+                    await _run_dag(
+                        comp,
+                        run_node,
+                        lambda node: skip_node(run_id, node),
+                        max(1, limits.maxConcurrency),
+                    )
+            except TimeoutError:
+                # a TimeoutError raised by a node itself is an ordinary failure
+                if not deadline.expired():
+                    raise
+                raise LimitExceeded(f"timeoutSeconds {limits.timeoutSeconds} exceeded")
+        except Exception as e:
+            error = e
 
+    # totals were flushed on exit; a failed run keeps its partial totals
+    await db.rollback()
+    if error is None:
         await db.execute(update(WorkflowRun).where(WorkflowRun.id==run_id).values(
             status="succeeded",
-            total_tokens=tot_in + tot_out,
-            total_cost_cents=tot_cost
+            finished_at=func.now(),
+            total_latency_ms=totals.latency_ms
         ))
         await db.commit()
-        await emit_event(db, run_id, None, "log", {"msg": "run complete"})
-    except Exception as e:
-        await db.execute(update(WorkflowRun).where(WorkflowRun.id==run_id).values(status="failed", error_summary=str(e)))
+        metrics.runs_finished.labels("succeeded").inc()
+        await emit_event(db, run_id, None, "log", {"msg": "run complete", "attempt": attempt})
+    else:
+        summary = f"limit_exceeded: {error}" if isinstance(error, LimitExceeded) else str(error)
+        await db.execute(update(WorkflowRun).where(WorkflowRun.id==run_id).values(
+            status="failed",
+            finished_at=func.now(),
+            total_latency_ms=totals.latency_ms,
+            error_summary=summary
+        ))
         await db.commit()
-        await emit_event(db, run_id, None, "log", {"msg": "run failed", "error": str(e)})
+        metrics.runs_finished.labels("failed").inc()
+        await emit_event(db, run_id, None, "log", {
+            "msg": "run failed", "attempt": attempt, "error": summary, "limit_exceeded": isinstance(error, LimitExceeded)
+        })
@@ -0,0 +1,77 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Union
+
+_PLACEHOLDER = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+_MISSING = object()
+
+
+class Lookup:
+    """A {{dotted.path}} placeholder with its candidate ctx keys precomputed"""
+
+    __slots__ = ("raw", "candidates")
+
+    def __init__(self, raw: str, path: str):
+        self.raw = raw
+        parts = path.split(".")
+        # ctx keys are flat ("node.<id>.output"); try the longest key first and
+        # walk the rest of the path into the value
+        self.candidates: List[Tuple[str, Tuple[str, ...]]] = [
+            (".".join(parts[:i]), tuple(parts[i:])) for i in range(len(parts), 0, -1)
+        ]
+
+    def resolve(self, ctx: Dict[str, Any]) -> Any:
+        for key, rest in self.candidates:
+            if key in ctx:
+                value = _walk(ctx[key], rest)
+                if value is not _MISSING:
+                    return value
+        return _MISSING
+
+
+def _walk(value: Any, rest: Tuple[str, ...]) -> Any:
+    for part in rest:
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, (list, tuple)) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        elif not part.startswith("_"):
+            value = getattr(value, part, _MISSING)
+        else:
+            value = _MISSING
+        if value is _MISSING:
+            break
+    return value
+
+
+class Template:
+    """Template parsed once into literal and lookup segments"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.segments: List[Union[str, Lookup]] = []
+        pos = 0
+        for m in _PLACEHOLDER.finditer(source):
+            if m.start() > pos:
+                self.segments.append(source[pos:m.start()])
+            self.segments.append(Lookup(m.group(0), m.group(1)))
+            pos = m.end()
+        if pos < len(source):
+            self.segments.append(source[pos:])
+
+    def render(self, ctx: Dict[str, Any]) -> str:
+        # single pass; only referenced values are touched. Unresolved
+        # placeholders are left as-is.
+        out = []
+        for seg in self.segments:
+            if isinstance(seg, str):
+                out.append(seg)
+            else:
+                value = seg.resolve(ctx)
+                out.append(seg.raw if value is _MISSING else value if isinstance(value, str) else str(value))
+        return "".join(out)
+
+
+@lru_cache(maxsize=4096)
+def compile_template(source: str) -> Template:
+    return Template(source)
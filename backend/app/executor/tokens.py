@@ -0,0 +1,78 @@
+import hashlib, logging
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional; falls back to an estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Used for models tiktoken doesn't know, including Gemini (no local tokenizer)
+DEFAULT_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=64)
+def _encoder(provider: str, model: str) -> Optional[Any]:
+    """Load an encoder once per (provider, model); None when unavailable"""
+    if tiktoken is None:
+        return None
+    try:
+        if provider == "openai":
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        logger.warning("tokenizer unavailable for %s/%s, estimating: %s", provider, model, e)
+        return None
+
+
+def warm_encoders(models: Iterable[Tuple[str, str]]) -> None:
+    """Load encoders up front; the first load may download BPE files"""
+    for provider, model in models:
+        _encoder(provider, model)
+
+
+def _estimate(text: str) -> int:
+    return len(text) // 4
+
+
+# keyed on a digest of the text so cached entries don't keep prompts alive
+_COUNT_CACHE_SIZE = 2048
+_counts: "OrderedDict[Tuple[str, str, bytes], int]" = OrderedDict()
+
+
+def count_tokens(provider: str, model: str, text: str) -> int:
+    """Token count for text; memoized so pre-flight and post-call counts are free"""
+    key = (provider, model, hashlib.blake2b(text.encode(), digest_size=16).digest())
+    n = _counts.get(key)
+    if n is not None:
+        _counts.move_to_end(key)
+        return n
+    enc = _encoder(provider, model)
+    n = _estimate(text) if enc is None else len(enc.encode(text, disallowed_special=()))
+    _counts[key] = n
+    if len(_counts) > _COUNT_CACHE_SIZE:
+        _counts.popitem(last=False)
+    return n
+
+
+def count_tokens_batch(provider: str, model: str, texts: List[str]) -> List[int]:
+    """Count many prompts at once (tiktoken encodes batches in parallel)"""
+    enc = _encoder(provider, model)
+    if enc is None:
+        return [_estimate(t) for t in texts]
+    return [len(ids) for ids in enc.encode_batch(texts, disallowed_special=())]
+
+
+def usage_tokens(usage: Optional[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    """Provider-reported usage (LangChain usage_metadata) as token_counts"""
+    if not usage or usage.get("input_tokens") is None or usage.get("output_tokens") is None:
+        return None
+    input_tokens = int(usage["input_tokens"])
+    output_tokens = int(usage["output_tokens"])
+    return {"input": input_tokens, "output": output_tokens, "total": input_tokens + output_tokens}
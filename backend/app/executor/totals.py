@@ -0,0 +1,94 @@
+import asyncio, logging, time
+from contextlib import asynccontextmanager
+from typing import Optional
+from sqlalchemy import update
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import async_session
+from app.models.workflow_runs import WorkflowRun
+
+logger = logging.getLogger(__name__)
+
+
+class RunTotals:
+    """
+    Accumulates a run's tokens and cost as nodes finish and writes them to
+    workflow_runs as atomic increments every flush_interval seconds, so the
+    row shows live totals while the run is in progress.
+    """
+
+    def __init__(self, run_id: str, flush_interval: float, base_latency_ms: int = 0):
+        self.run_id = run_id
+        self.flush_interval = flush_interval
+        self.base_latency_ms = base_latency_ms
+        self.started = time.perf_counter()
+        self._tokens = 0
+        self._cost_cents = 0
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    @property
+    def latency_ms(self) -> int:
+        return self.base_latency_ms + int((time.perf_counter() - self.started) * 1000)
+
+    def start(self) -> None:
+        self._timer = asyncio.create_task(self._periodic())
+
+    async def _periodic(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                # deltas stay pending and are retried on the next flush
+                pass
+
+    def add(self, tokens: int, cost_cents: int) -> None:
+        self._tokens += tokens
+        self._cost_cents += cost_cents
+
+    async def flush(self) -> None:
+        async with self._lock:
+            tokens, cost, self._tokens, self._cost_cents = self._tokens, self._cost_cents, 0, 0
+            try:
+                with metrics.span("db.run_totals"):
+                    async with async_session() as db:
+                        await db.execute(update(WorkflowRun).where(WorkflowRun.id==self.run_id).values(
+                            total_tokens=WorkflowRun.total_tokens + tokens,
+                            total_cost_cents=WorkflowRun.total_cost_cents + cost,
+                            total_latency_ms=self.latency_ms,
+                        ))
+                        await db.commit()
+            except Exception:
+                self._tokens += tokens
+                self._cost_cents += cost
+                raise
+
+    async def close(self, attempts: int = 3) -> None:
+        """
+        Final flush, retried with a short backoff. Never raises, so the run's
+        final status is always written; unflushed totals are logged instead.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        for attempt in range(attempts):
+            try:
+                await self.flush()
+                return
+            except Exception as e:
+                logger.warning("run totals flush failed (attempt %d/%d): %s", attempt + 1, attempts, e)
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        logger.error("lost run totals for run %s: %d tokens, %d cents", self.run_id, self._tokens, self._cost_cents)
+
+
+@asynccontextmanager
+async def run_totals(run_id: str, base_latency_ms: int = 0):
+    """Track live totals for the duration of a run; always flushed on exit"""
+    totals = RunTotals(run_id, settings.RUN_TOTALS_FLUSH_INTERVAL_SECONDS, base_latency_ms)
+    totals.start()
+    try:
+        yield totals
+    finally:
+        await totals.close()
@@ -1,30 +1,226 @@
-import asyncio
-from typing import Any, Dict, DefaultDict, List, Optional
-from collections import defaultdict
+import asyncio, logging, time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import insert
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import async_session
+from app.executor.eventbus import get_event_bus
 from app.models.trace_events import TraceEvent
 
-# Per-run async subscribers for SSE (in-memory for V1)
-_subscribers: DefaultDict[str, List[asyncio.Queue]] = defaultdict(list)
+logger = logging.getLogger(__name__)
 
-async def subscribe(run_id: str) -> asyncio.Queue:
-    q: asyncio.Queue = asyncio.Queue()
-    _subscribers[run_id].append(q)
-    return q
+def subscribe(run_id: str, last_event_id: Optional[str] = None) -> AsyncIterator[Optional[Tuple[str, Dict[str, Any]]]]:
+    """Live (event_id, event) feed for a run, resuming after last_event_id; None on idle"""
+    return get_event_bus().subscribe(run_id, last_event_id, settings.SSE_HEARTBEAT_SECONDS)
 
-def _cleanup(run_id: str, q: asyncio.Queue):
+def is_terminal(event: Dict[str, Any], attempt: int = 1) -> bool:
+    """True for the final event run_workflow emits for the given attempt of a run"""
+    payload = event.get("payload", {})
+    if event.get("step_id") is not None or payload.get("msg") not in ("run complete", "run failed"):
+        return False
+    # an earlier attempt's end is followed by "run resumed" and the next attempt
+    return payload.get("attempt", 1) >= attempt
+
+
+class TraceSink:
+    """
+    Buffers a run's trace events and writes them with one multi-row INSERT
+    when the buffer reaches max_batch or every flush_interval seconds.
+    """
+
+    def __init__(self, max_batch: int, flush_interval: float):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._buf: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._timer = asyncio.create_task(self._periodic())
+
+    async def _periodic(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._try_flush()
+
+    async def _try_flush(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            # rows stay buffered and are retried on the next flush
+            pass
+
+    async def add(self, row: Dict[str, Any]) -> None:
+        self._buf.append(row)
+        if len(self._buf) >= self.max_batch:
+            await self._try_flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._buf:
+                return
+            rows, self._buf = self._buf, []
+            try:
+                t0 = time.perf_counter()
+                with metrics.span("db.trace_flush", events=len(rows)):
+                    async with async_session() as db:
+                        await db.execute(insert(TraceEvent).values(rows))
+                        await db.commit()
+                metrics.trace_flush_duration.observe(time.perf_counter() - t0)
+                metrics.trace_events_written.inc(len(rows))
+            except Exception:
+                self._buf[:0] = rows
+                raise
+
+    async def close(self, attempts: int = 3) -> None:
+        """
+        Final flush, retried with a short backoff; whatever is still buffered
+        after that is inserted row by row so one bad row can't drop the rest.
+        Never raises: the run's status has already been written.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        for attempt in range(attempts):
+            try:
+                await self.flush()
+                return
+            except Exception as e:
+                logger.warning("trace flush failed (attempt %d/%d): %s", attempt + 1, attempts, e)
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        rows, self._buf = self._buf, []
+        lost = 0
+        for row in rows:
+            try:
+                async with async_session() as db:
+                    await db.execute(insert(TraceEvent).values(**row))
+                    await db.commit()
+            except Exception as e:
+                lost += 1
+                logger.error("dropping trace event %s for run %s: %s", row["kind"], row["run_id"], e)
+        if lost:
+            logger.error("lost %d of %d trace events at run end", lost, len(rows))
+
+
+class DeltaCoalescer:
+    """
+    Groups streamed completion chunks into `llm.delta` events, flushing once
+    min_chars have accumulated or the oldest chunk is max_delay seconds old
+    (a timer armed by the first buffered chunk, so a stalled stream still
+    shows what it has).
+    Every provider call (retry, fallback, hedge) is a separate attempt; when
+    one fails or loses a hedge its buffered chunks are dropped and, if it had
+    already emitted deltas, an `llm.delta.reset` tells consumers to discard
+    that attempt's text.
+    """
+
+    def __init__(self, db: AsyncSession, run_id: str, step_id: Optional[str], min_chars: int, max_delay: float):
+        self.db = db
+        self.run_id = run_id
+        self.step_id = step_id
+        self.min_chars = min_chars
+        self.max_delay = max_delay
+        self.seq = 0
+        self.attempts = 0
+        self._emitted: set = set()
+        self._provider: Optional[str] = None
+        self._attempt = 0
+        self._parts: List[str] = []
+        self._size = 0
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def new_attempt(self) -> int:
+        self.attempts += 1
+        return self.attempts
+
+    async def discard(self, attempt: int, provider: str) -> None:
+        if self._parts and self._attempt == attempt:
+            self._parts, self._size = [], 0
+            self._disarm()
+        if attempt in self._emitted:
+            await emit_event(self.db, self.run_id, self.step_id, "llm.delta.reset", {
+                "attempt": attempt, "provider": provider
+            })
+
+    async def add(self, provider: str, attempt: int, text: str) -> None:
+        if self._parts and attempt != self._attempt:
+            await self.flush()
+        if not self._parts:
+            self._timer = asyncio.create_task(self._flush_later())
+        self._provider = provider
+        self._attempt = attempt
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.min_chars:
+            await self.flush()
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_delay)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning("delta flush failed for run %s: %s", self.run_id, e)
+
+    def _disarm(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def flush(self) -> None:
+        self._disarm()
+        if not self._parts:
+            return
+        text, self._parts, self._size = "".join(self._parts), [], 0
+        self.seq += 1
+        payload = {"seq": self.seq, "attempt": self._attempt, "provider": self._provider, "text": text}
+        self._emitted.add(self._attempt)
+        # the timer and the stream can flush concurrently; keep events in seq order
+        async with self._lock:
+            await emit_event(self.db, self.run_id, self.step_id, "llm.delta", payload)
+
+
+# Active sinks by run_id; runs without a sink fall back to a direct insert
+_sinks: Dict[str, TraceSink] = {}
+
+@asynccontextmanager
+async def trace_sink(run_id: str):
+    """Buffer trace events for the duration of a run; always flushed on exit"""
+    sink = TraceSink(settings.TRACE_FLUSH_MAX_EVENTS, settings.TRACE_FLUSH_INTERVAL_SECONDS)
+    sink.start()
+    _sinks[run_id] = sink
     try:
-        _subscribers[run_id].remove(q)
-    except ValueError:
-        pass
+        yield sink
+    finally:
+        # events emitted from here on are inserted directly
+        _sinks.pop(run_id, None)
+        await sink.close()
 
 async def emit_event(db: AsyncSession, run_id: str, step_id: Optional[str], kind: str, payload: Dict[str, Any]):
     # Persist
-    await db.execute(insert(TraceEvent).values(
-        run_id=run_id, step_id=step_id, kind=kind, payload=payload
-    ))
-    await db.commit()
-    # Fan-out
-    for q in _subscribers.get(run_id, []):
-        await q.put({"kind": kind, "step_id": step_id, "payload": payload})
+    row = {
+        "run_id": run_id, "step_id": step_id, "kind": kind, "payload": payload,
+        "ts": datetime.now(timezone.utc),
+    }
+    sink = _sinks.get(run_id)
+    if sink is not None:
+        await sink.add(row)
+    else:
+        t0 = time.perf_counter()
+        with metrics.span("db.trace_insert", kind=kind):
+            await db.execute(insert(TraceEvent).values(**row))
+            await db.commit()
+        metrics.trace_flush_duration.observe(time.perf_counter() - t0)
+        metrics.trace_events_written.inc()
+    # Fan-out; live streaming is best-effort and never fails the run
+    try:
+        await get_event_bus().publish(run_id, {
+            "ts": row["ts"].isoformat(), "kind": kind, "step_id": step_id, "payload": payload
+        })
+    except Exception:
+        pass
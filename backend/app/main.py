@@ -1,5 +1,7 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from .api import workflows, runs, stream
+from .core import metrics
+from .executor.eventbus import get_event_bus
 
 app = FastAPI(title="FlowTrace")
 
@@ -7,6 +9,14 @@ app.include_router(workflows.router, prefix="/api/workflows", tags=["workflows"]
 app.include_router(runs.router, prefix="/api/runs", tags=["runs"])
 app.include_router(stream.router, prefix="/api/stream", tags=["stream"])
 
+if metrics.enabled:
+    metrics.sse_subscribers.set_function(lambda: get_event_bus().active_subscribers)
+
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        body, content_type = metrics.render_latest()
+        return Response(body, media_type=content_type)
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Text, Integer, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Text, Integer, JSON, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -18,4 +18,10 @@ class RunStep(Base):
     tokens_input = Column(Integer, default=0)
     tokens_output = Column(Integer, default=0)
     cost_cents = Column(Integer, default=0)
-    error_summary = Column(Text)
\ No newline at end of file
+    error_summary = Column(Text)
+    # checkpointed node output, used to resume a failed run
+    output = Column(JSON)
+
+    __table_args__ = (
+        Index("ix_run_steps_run_id_started_at", "run_id", "started_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Text, TIMESTAMP, ForeignKey, JSON
+from sqlalchemy import Column, Text, Integer, TIMESTAMP, ForeignKey, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID, BIGINT
 from sqlalchemy.sql import func
 from .base import Base
@@ -6,9 +6,15 @@ from .base import Base
 class TraceEvent(Base):
     __tablename__ = "trace_events"
 
-    id = Column(BIGINT, primary_key=True, autoincrement=True)
+    # plain INTEGER on sqlite, the only type it autoincrements (bench stand-in)
+    id = Column(BIGINT().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     run_id = Column(UUID(as_uuid=True), ForeignKey("workflow_runs.id", ondelete="CASCADE"))
     step_id = Column(UUID(as_uuid=True), ForeignKey("run_steps.id", ondelete="SET NULL"))
     ts = Column(TIMESTAMP(timezone=True), server_default=func.now())
     kind = Column(Text, nullable=False)
     payload = Column(JSON, nullable=False)
+
+    __table_args__ = (
+        Index("ix_trace_events_run_id_id", "run_id", "id"),
+        Index("ix_trace_events_step_id_id", "step_id", "id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Text, Integer, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Text, Integer, JSON, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -15,4 +15,16 @@ class WorkflowRun(Base):
     total_tokens = Column(Integer, default=0)
     total_cost_cents = Column(Integer, default=0)
     total_latency_ms = Column(Integer, default=0)
-    error_summary = Column(Text)
\ No newline at end of file
+    error_summary = Column(Text)
+    # run inputs, exposed to templates as {{input.<key>}}
+    inputs = Column(JSON)
+    batch_id = Column(UUID(as_uuid=True))
+    # bumped by each resume; run-level trace events carry the attempt they belong to
+    attempt = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (
+        Index("ix_workflow_runs_started_at_id", "started_at", "id"),
+        Index("ix_workflow_runs_workflow_id_started_at_id", "workflow_id", "started_at", "id"),
+        Index("ix_workflow_runs_status_started_at_id", "status", "started_at", "id"),
+        Index("ix_workflow_runs_batch_id_status", "batch_id", "status"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Text, JSON, TIMESTAMP
+from sqlalchemy import Column, Text, JSON, TIMESTAMP, Index
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -12,4 +12,8 @@ class Workflow(Base):
     description = Column(Text)
     graph_json = Column(JSON, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
-    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_workflows_created_at_id", "created_at", "id"),
+    )
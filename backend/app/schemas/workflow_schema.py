@@ -18,7 +18,9 @@ class Edge(BaseModel):
 class Limits(BaseModel):
     maxNodes: int = Field(default=20)
     maxTokens: int = Field(default=150000)
+    maxCostCents: Optional[int] = None
     timeoutSeconds: int = Field(default=120)
+    maxConcurrency: int = Field(default=8)
     
 class WorkflowSpec(BaseModel):
     version: str
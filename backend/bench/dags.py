@@ -0,0 +1,62 @@
+from typing import Any, Callable, Dict, List
+
+
+def _llm(node_id: str, text: str) -> Dict[str, Any]:
+    return {
+        "id": node_id, "type": "llm", "name": node_id,
+        "inputs": {"text": text},
+        "config": {"provider": "mock", "model": "mock-1", "cache": False},
+    }
+
+
+def _spec(nodes: List[Dict[str, Any]], edges: List[Dict[str, str]], max_concurrency: int) -> Dict[str, Any]:
+    return {
+        "version": "1",
+        "entry": nodes[0]["id"],
+        "nodes": nodes,
+        "edges": edges,
+        "limits": {
+            "maxNodes": len(nodes), "maxTokens": 10**9,
+            "timeoutSeconds": 3600, "maxConcurrency": max_concurrency,
+        },
+    }
+
+
+def chain(n: int, max_concurrency: int = 8) -> Dict[str, Any]:
+    """n nodes in a line, each reading its predecessor's output"""
+    nodes = [_llm("n0", "start")]
+    edges = []
+    for i in range(1, n):
+        nodes.append(_llm(f"n{i}", f"continue {{{{node.n{i-1}.output}}}}"))
+        edges.append({"from": f"n{i-1}", "to": f"n{i}"})
+    return _spec(nodes, edges, max_concurrency)
+
+
+def fanout(n: int, max_concurrency: int = 8) -> Dict[str, Any]:
+    """one source, n-2 parallel branches, one join"""
+    nodes = [_llm("src", "start")]
+    edges = []
+    for i in range(max(1, n - 2)):
+        nodes.append(_llm(f"b{i}", f"branch {i} {{{{node.src.output}}}}"))
+        edges.append({"from": "src", "to": f"b{i}"})
+    nodes.append(_llm("join", "join {{node.b0.output}}"))
+    edges.extend({"from": f"b{i}", "to": "join"} for i in range(max(1, n - 2)))
+    return _spec(nodes, edges, max_concurrency)
+
+
+def diamond(n: int, max_concurrency: int = 8) -> Dict[str, Any]:
+    """a chain of diamonds (top -> left, right -> bottom), bottoms shared as tops"""
+    nodes = [_llm("d0", "start")]
+    edges = []
+    for i in range(max(1, (n - 1) // 3)):
+        top, bottom = f"d{i}", f"d{i+1}"
+        for side in ("l", "r"):
+            mid = f"{side}{i}"
+            nodes.append(_llm(mid, f"{side} {{{{node.{top}.output}}}}"))
+            edges.append({"from": top, "to": mid})
+            edges.append({"from": mid, "to": bottom})
+        nodes.append(_llm(bottom, f"merge {{{{node.l{i}.output}}}} {{{{node.r{i}.output}}}}"))
+    return _spec(nodes, edges, max_concurrency)
+
+
+SHAPES: Dict[str, Callable[..., Dict[str, Any]]] = {"chain": chain, "fanout": fanout, "diamond": diamond}
@@ -0,0 +1,84 @@
+"""
+Local sqlite stand-in for Postgres. Must be configured before any `app`
+module is imported, since settings and the engine are created at import time.
+"""
+import os, uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+def configure(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    os.environ["EVENT_BUS_BACKEND"] = "memory"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    # sqlite locks the whole database for a write, so a size-triggered trace
+    # flush inside a node's open transaction would wait on itself; flush on
+    # the timer only
+    os.environ["TRACE_FLUSH_MAX_EVENTS"] = "1000000"
+
+
+def _install_uuid_type() -> None:
+    # the executor binds ids as strings, which asyncpg accepts and sqlite's Uuid doesn't
+    from sqlalchemy.types import TypeDecorator, Uuid
+    from app.models import Base
+
+    class StrUuid(TypeDecorator):
+        impl = Uuid
+        cache_ok = True
+
+        def process_bind_param(self, value, dialect):
+            return uuid.UUID(str(value)) if value is not None else None
+
+    for table in Base.metadata.tables.values():
+        for column in table.columns:
+            if isinstance(column.type, Uuid):
+                column.type = StrUuid()
+
+
+def _on_connect(dbapi_conn, record) -> None:
+    # WAL + no fsync so the numbers measure the executor, not the disk
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA busy_timeout=60000")
+    cursor.close()
+    # transactions are begun explicitly in _on_begin
+    dbapi_conn.isolation_level = None
+
+
+def _on_begin(conn) -> None:
+    # take the write lock up front: a deferred transaction that reads first
+    # fails with "database is locked" instead of waiting when it upgrades
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+async def create_schema() -> None:
+    from sqlalchemy import event
+    from app.db.session import engine
+    from app.models import Base
+    _install_uuid_type()
+    event.listen(engine.sync_engine, "connect", _on_connect)
+    event.listen(engine.sync_engine, "begin", _on_begin)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@contextmanager
+def count_statements() -> Iterator[Dict[str, int]]:
+    """Counts every statement the engine sends while the block runs"""
+    from sqlalchemy import event
+    from app.db.session import engine
+    counter = {"statements": 0}
+
+    def on_execute(conn, cursor, statement, *args):
+        if not statement.startswith("BEGIN"):
+            counter["statements"] += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
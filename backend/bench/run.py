@@ -0,0 +1,153 @@
+"""
+Offline executor benchmark.
+
+    cd backend && python -m bench.run --shapes chain,fanout --sizes 10,100 --runs 20
+
+Runs synthetic workflows through the real executor against the built-in
+`mock` provider and a local sqlite database, then reports runs/sec, p50/p99
+run latency, DB statements per run and peak traced memory.
+"""
+import argparse, asyncio, os, tempfile, time, tracemalloc, uuid
+from typing import Any, Dict, List
+
+from bench import db as bench_db
+from bench.dags import SHAPES
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def bench_runs(graph: Dict[str, Any], runs: int, parallel: int) -> Dict[str, float]:
+    from sqlalchemy import func, insert, select
+    from app.db.session import async_session
+    from app.executor.compiler import graph_cache
+    from app.executor.runner import run_workflow
+    from app.models import Workflow, WorkflowRun
+
+    wf_id = uuid.uuid4()
+    run_ids = [uuid.uuid4() for _ in range(runs + 2)]
+    async with async_session() as db:
+        await db.execute(insert(Workflow).values(id=wf_id, name="bench", graph_json=graph))
+        await db.execute(insert(WorkflowRun).values([
+            {"id": rid, "workflow_id": wf_id, "status": "queued"} for rid in run_ids
+        ]))
+        await db.commit()
+
+    comp = graph_cache.load(graph, str(wf_id))
+    latencies: List[float] = []
+    gate = asyncio.Semaphore(parallel)
+
+    async def one(rid: uuid.UUID) -> float:
+        async with gate:
+            t0 = time.perf_counter()
+            async with async_session() as db:
+                await run_workflow(db, str(rid), comp)
+            return time.perf_counter() - t0
+
+    # warm-up (lazy imports, client construction, pool fill) is not measured
+    warmup, traced, timed = run_ids[0], run_ids[1], run_ids[2:]
+    await one(warmup)
+
+    with bench_db.count_statements() as counter:
+        t0 = time.perf_counter()
+        latencies = await asyncio.gather(*(one(rid) for rid in timed))
+        elapsed = time.perf_counter() - t0
+
+    async with async_session() as db:
+        failed = (await db.execute(select(func.count()).where(
+            WorkflowRun.id.in_(timed), WorkflowRun.status != "succeeded"
+        ))).scalar_one()
+
+    # tracemalloc slows allocation-heavy code a lot, so memory gets its own run
+    tracemalloc.start()
+    await one(traced)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "runs_per_sec": runs / elapsed,
+        "failed": failed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "stmts_per_run": counter["statements"] / runs,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def bench_compile(graph: Dict[str, Any], iterations: int) -> float:
+    from app.executor.compiler import compile_graph
+    from app.schemas.workflow_schema import WorkflowSpec
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        compile_graph(WorkflowSpec.parse_obj(graph))
+    return iterations / (time.perf_counter() - t0)
+
+
+def bench_templates(iterations: int) -> float:
+    from app.executor.templates import compile_template
+    ctx = {f"node.n{i}.output": "x" * 200 for i in range(50)}
+    # nodes render the Template precompiled on their CompiledGraph
+    template = compile_template("a {{node.n1.output}} b {{node.n25.output}} c {{node.n49.output}} d")
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        template.render(ctx)
+    return iterations / (time.perf_counter() - t0)
+
+
+async def bench_emit(events: int) -> float:
+    from sqlalchemy import insert
+    from app.db.session import async_session
+    from app.executor.tracing import emit_event, trace_sink
+    from app.models import Workflow, WorkflowRun
+
+    wf_id, run_id = uuid.uuid4(), uuid.uuid4()
+    async with async_session() as db:
+        await db.execute(insert(Workflow).values(id=wf_id, name="bench", graph_json={}))
+        await db.execute(insert(WorkflowRun).values(id=run_id, workflow_id=wf_id, status="running"))
+        await db.commit()
+        t0 = time.perf_counter()
+        async with trace_sink(str(run_id)):
+            for i in range(events):
+                await emit_event(db, str(run_id), None, "log", {"i": i})
+        return events / (time.perf_counter() - t0)
+
+
+async def main(args: argparse.Namespace) -> None:
+    from app.core.config import settings
+    settings.MOCK_LLM_LATENCY_MS = args.latency_ms
+    settings.MOCK_LLM_LATENCY_JITTER_MS = args.jitter_ms
+    settings.MOCK_LLM_ERROR_RATE = args.error_rate
+    settings.LLM_RETRY_BASE_DELAY_SECONDS = 0.01
+    await bench_db.create_schema()
+
+    print(f"{'shape':<8} {'nodes':>6} {'runs/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'stmts/run':>10} {'peak MB':>8} {'compiles/s':>11} {'failed':>7}")
+    for shape in args.shapes.split(","):
+        for size in (int(s) for s in args.sizes.split(",")):
+            graph = SHAPES[shape](size, args.max_concurrency)
+            runs = max(1, args.runs if size <= 100 else args.runs // 10)
+            r = await bench_runs(graph, runs, args.parallel)
+            compiles = bench_compile(graph, max(1, 2000 // size))
+            print(
+                f"{shape:<8} {len(graph['nodes']):>6} {r['runs_per_sec']:>9.2f} {r['p50_ms']:>9.1f} "
+                f"{r['p99_ms']:>9.1f} {r['stmts_per_run']:>10.1f} {r['peak_mb']:>8.1f} {compiles:>11.1f} {r['failed']:>7}"
+            )
+    print(f"template renders/s {bench_templates(100_000):,.0f}")
+    print(f"emit_event/s       {await bench_emit(5_000):,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FlowTrace executor benchmark")
+    parser.add_argument("--shapes", default="chain,fanout,diamond")
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--runs", type=int, default=20, help="runs per workflow (a tenth for >100 nodes)")
+    parser.add_argument("--parallel", type=int, default=4, help="runs executed concurrently")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="limits.maxConcurrency per run")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="mean mock LLM latency")
+    parser.add_argument("--jitter-ms", type=float, default=1.0, help="std deviation of mock LLM latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock failure rate; retries and circuit breakers apply")
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "flowtrace-bench.db"))
+    args = parser.parse_args()
+    bench_db.configure(args.db)
+    asyncio.run(main(args))
@@ -0,0 +1,72 @@
+import asyncio, logging, threading
+from typing import Any, Coroutine, Optional
+from sqlalchemy import text
+from app.db.session import engine
+from app.core.pricing import PRICING_CENTS_PER_1K
+from app.executor.clients import client_registry
+from app.executor.tokens import warm_encoders
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerRuntime:
+    """
+    One long-lived event loop per worker process, running in a background
+    thread. The DB engine's connection pool, Redis clients and pooled LLM
+    clients all bind to this loop once and are reused by every task.
+    """
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._serve, args=(loop,), name="flowtrace-loop", daemon=True)
+            self._thread.start()
+            self.loop = loop
+        asyncio.run_coroutine_threadsafe(self._on_start(), loop).result()
+
+    @staticmethod
+    def _serve(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _on_start(self) -> None:
+        # connections inherited from the parent process must not be reused after fork
+        await engine.dispose(close=False)
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except Exception as e:
+            logger.warning("database warm-up failed: %s", e)
+        # tokenizer files load synchronously; do it here, off the loop, not in the first node
+        await asyncio.to_thread(warm_encoders, PRICING_CENTS_PER_1K)
+
+    async def _on_stop(self) -> None:
+        await client_registry.aclose()
+        await engine.dispose()
+
+    def run(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        """Run a coroutine on the worker loop and block until it finishes"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self) -> None:
+        with self._lock:
+            loop, self.loop = self.loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._on_stop(), loop).result(timeout=10)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(timeout=10)
+            loop.close()
+
+
+runtime = WorkerRuntime()
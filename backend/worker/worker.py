@@ -1,26 +1,54 @@
-import asyncio
+from datetime import datetime, timezone
+from billiard.process import current_process
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+from app.core import metrics
 from app.core.config import settings
 from app.db.session import async_session
 from app.executor.runner import run_workflow
-from sqlalchemy import insert
+from sqlalchemy import insert, update, func
 from app.models.workflow_runs import WorkflowRun
 from app.models.workflows import Workflow
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.schemas.workflow_schema import WorkflowSpec
+from app.executor.compiler import graph_cache
+from worker.runtime import runtime
 
 celery = Celery("flowtrace", broker=settings.REDIS_URL, backend=settings.REDIS_URL)
 
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    runtime.start()
+    # one scrape port per pool process: WORKER_METRICS_PORT + process index
+    metrics.start_http_server(settings.WORKER_METRICS_PORT + (getattr(current_process(), "index", None) or 0))
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    runtime.stop()
+
 @celery.task
-def execute_workflow(run_id: str):
-    asyncio.run(_async_execute(run_id))
+def execute_workflow(run_id: str, resume: bool = False):
+    # runs on the process-wide loop (started lazily for solo/thread pools)
+    runtime.run(_async_execute(run_id, resume))
     return f"executed {run_id}"
 
-async def _async_execute(run_id: str):
+async def _async_execute(run_id: str, resume: bool = False):
     async with async_session() as db:  # type: AsyncSession
         # load workflow + graph
         run = await db.get(WorkflowRun, run_id)
+        if run.started_at is not None and not resume:
+            metrics.queue_wait.observe((datetime.now(timezone.utc) - run.started_at).total_seconds())
         wf = await db.get(Workflow, run.workflow_id)
-        spec = WorkflowSpec.parse_obj(wf.graph_json)
-        await run_workflow(db, str(run_id), spec)
+        try:
+            if wf is None:
+                raise ValueError("workflow not found")
+            comp = graph_cache.load(wf.graph_json, str(wf.id))
+        except ValueError as e:
+            # fail the run instead of leaving it queued
+            await db.execute(update(WorkflowRun).where(WorkflowRun.id==run_id).values(
+                status="failed", finished_at=func.now(), error_summary=str(e)
+            ))
+            await db.commit()
+            metrics.runs_finished.labels("failed").inc()
+            return
+        await run_workflow(db, str(run_id), comp, resume)